@@ -2,6 +2,7 @@
 图像分析相关API端点
 """
 
+import asyncio
 import logging
 import uuid
 from datetime import datetime
@@ -22,7 +23,7 @@ from models.image import (
     SimpleExtractionRequest,
     SimpleExtractionResponse,
 )
-from services.cache_service import cache_service
+from services.cache_service import cache_params_digest, cache_service
 from services.enhanced_vision_service import enhanced_vision_service
 from services.gcs_service import gcs_service
 from services.image_processing_service import image_processing_service
@@ -67,13 +68,13 @@ async def analyze_image(request: Request, analysis_request: ImageAnalysisRequest
                     from_cache=True,
                 )
 
-        # 获取图像信息
-        image_info = await storage_service.get_image_info_by_hash(image_hash)
+        # 并发获取图像信息与内容
+        image_info, image_content = await asyncio.gather(
+            storage_service.get_image_info_by_hash(image_hash),
+            gcs_service.download_image(image_hash),
+        )
         if not image_info:
             raise HTTPException(status_code=404, detail="图像未找到")
-
-        # 从GCS下载图像内容进行分析
-        image_content = await gcs_service.download_image(image_hash)
         if not image_content:
             raise HTTPException(status_code=404, detail="无法获取图像内容")
 
@@ -159,13 +160,13 @@ async def detect_objects_enhanced(
             cached_response.from_cache = True
             return cached_response
 
-        # Get image information
-        image_info = await storage_service.get_image_info_by_hash(image_hash)
+        # Fetch image information and content concurrently
+        image_info, image_content = await asyncio.gather(
+            storage_service.get_image_info_by_hash(image_hash),
+            gcs_service.download_image(image_hash),
+        )
         if not image_info:
             raise HTTPException(status_code=404, detail="图像未找到")
-
-        # Download image content from GCS
-        image_content = await gcs_service.download_image(image_hash)
         if not image_content:
             raise HTTPException(status_code=404, detail="无法获取图像内容")
 
@@ -215,7 +216,7 @@ async def extract_object_simple(
         extraction_id = f"extract_{image_hash[:8]}_{uuid.uuid4().hex[:8]}"
 
         # Check cache first
-        cache_key = f"simple_extraction:{image_hash}:{hash(str(extraction_request.bounding_box.dict()))}:{extraction_request.output_format}:{extraction_request.add_padding}"
+        cache_key = f"simple_extraction:{image_hash}:{cache_params_digest(extraction_request.bounding_box.dict())}:{extraction_request.output_format}:{extraction_request.add_padding}"
         cached_result = await cache_service.get_cached_data(cache_key)
 
         if cached_result:
@@ -225,13 +226,13 @@ async def extract_object_simple(
             cached_response.processing_time_ms = processing_time
             return cached_response
 
-        # Get image information
-        image_info = await storage_service.get_image_info_by_hash(image_hash)
+        # Fetch image information and content concurrently
+        image_info, image_content = await asyncio.gather(
+            storage_service.get_image_info_by_hash(image_hash),
+            gcs_service.download_image(image_hash),
+        )
         if not image_info:
             raise HTTPException(status_code=404, detail="图像未找到")
-
-        # Download image content from GCS
-        image_content = await gcs_service.download_image(image_hash)
         if not image_content:
             raise HTTPException(status_code=404, detail="无法获取图像内容")
 
@@ -338,7 +339,7 @@ async def analyze_by_labels(request: Request, analysis_request: LabelAnalysisReq
         image_hash = analysis_request.image_hash
 
         # Check cache first
-        cache_key = f"label_analysis:{image_hash}:{hash(str(sorted(analysis_request.target_categories)))}:{analysis_request.confidence_threshold}:{analysis_request.max_labels}"
+        cache_key = f"label_analysis:{image_hash}:{cache_params_digest(sorted(analysis_request.target_categories))}:{analysis_request.confidence_threshold}:{analysis_request.max_labels}"
         cached_result = await cache_service.get_cached_data(cache_key)
 
         if cached_result:
@@ -348,13 +349,13 @@ async def analyze_by_labels(request: Request, analysis_request: LabelAnalysisReq
             cached_response.processing_time_ms = processing_time
             return cached_response
 
-        # Get image information
-        image_info = await storage_service.get_image_info_by_hash(image_hash)
+        # Fetch image information and content concurrently
+        image_info, image_content = await asyncio.gather(
+            storage_service.get_image_info_by_hash(image_hash),
+            gcs_service.download_image(image_hash),
+        )
         if not image_info:
             raise HTTPException(status_code=404, detail="图像未找到")
-
-        # Download image content from GCS
-        image_content = await gcs_service.download_image(image_hash)
         if not image_content:
             raise HTTPException(status_code=404, detail="无法获取图像内容")
 
@@ -508,18 +509,18 @@ async def analyze_nature(request: Request, analysis_request: NaturalElementsRequ
 
         if cached_result:
             processing_time = int((datetime.now() - start_time).total_seconds() * 1000)
-            cached_response = NaturalElementsResponse(**cached_result)
-            cached_response.from_cache = True
-            cached_response.processing_time_ms = processing_time
-            return cached_response
+            # 响应模型不可变，用model_copy生成带缓存标记的副本
+            return NaturalElementsResponse(**cached_result).model_copy(
+                update={"from_cache": True, "processing_time_ms": processing_time}
+            )
 
-        # Get image information
-        image_info = await storage_service.get_image_info_by_hash(image_hash)
+        # Fetch image information and content concurrently
+        image_info, image_content = await asyncio.gather(
+            storage_service.get_image_info_by_hash(image_hash),
+            gcs_service.download_image(image_hash),
+        )
         if not image_info:
             raise HTTPException(status_code=404, detail="图像未找到")
-
-        # Download image content from GCS
-        image_content = await gcs_service.download_image(image_hash)
         if not image_content:
             raise HTTPException(status_code=404, detail="无法获取图像内容")
 
@@ -604,13 +605,13 @@ async def detect_objects_optimized(
             cached_response.processing_time_ms = processing_time
             return cached_response
 
-        # Get image information
-        image_info = await storage_service.get_image_info_by_hash(image_hash)
+        # Fetch image information and content concurrently
+        image_info, image_content = await asyncio.gather(
+            storage_service.get_image_info_by_hash(image_hash),
+            gcs_service.download_image(image_hash),
+        )
         if not image_info:
             raise HTTPException(status_code=404, detail="图像未找到")
-
-        # Download image content from GCS with optimization
-        image_content = await gcs_service.download_image(image_hash)
         if not image_content:
             raise HTTPException(status_code=404, detail="无法获取图像内容")
 
@@ -677,18 +678,18 @@ async def analyze_nature_optimized(
 
         if cached_result:
             processing_time = int((datetime.now() - start_time).total_seconds() * 1000)
-            cached_response = NaturalElementsResponse(**cached_result)
-            cached_response.from_cache = True
-            cached_response.processing_time_ms = processing_time
-            return cached_response
+            # 响应模型不可变，用model_copy生成带缓存标记的副本
+            return NaturalElementsResponse(**cached_result).model_copy(
+                update={"from_cache": True, "processing_time_ms": processing_time}
+            )
 
-        # Get image information
-        image_info = await storage_service.get_image_info_by_hash(image_hash)
+        # Fetch image information and content concurrently
+        image_info, image_content = await asyncio.gather(
+            storage_service.get_image_info_by_hash(image_hash),
+            gcs_service.download_image(image_hash),
+        )
         if not image_info:
             raise HTTPException(status_code=404, detail="图像未找到")
-
-        # Download image content from GCS
-        image_content = await gcs_service.download_image(image_hash)
         if not image_content:
             raise HTTPException(status_code=404, detail="无法获取图像内容")
 
@@ -2,6 +2,7 @@
 图像相关API端点
 """
 
+import asyncio
 import logging
 import uuid
 from datetime import datetime
@@ -24,7 +25,7 @@ from models.image import (
     ImageInfo,
     ImageUploadResponse,
 )
-from services.cache_service import cache_service
+from services.cache_service import cache_params_digest, cache_service
 from services.gcs_service import gcs_service
 from services.hash_service import hash_service
 from services.image_annotation_service import image_annotation_service
@@ -209,9 +210,7 @@ async def download_annotated(
         image_hash = annotation_request.image_hash
 
         # Check cache first
-        cache_key = (
-            f"annotated_image:{image_hash}:{hash(str(annotation_request.dict()))}"
-        )
+        cache_key = f"annotated_image:{image_hash}:{cache_params_digest(annotation_request.dict())}"
         cached_result = await cache_service.get_cached_data(cache_key)
 
         if cached_result and not annotation_request.force_refresh:
@@ -221,13 +220,13 @@ async def download_annotated(
             cached_response.processing_time_ms = processing_time
             return cached_response
 
-        # Get image information
-        image_info = await storage_service.get_image_info_by_hash(image_hash)
+        # Fetch image information and content concurrently
+        image_info, image_content = await asyncio.gather(
+            storage_service.get_image_info_by_hash(image_hash),
+            gcs_service.download_image(image_hash),
+        )
         if not image_info:
             raise ImageNotFoundError(image_hash=image_hash)
-
-        # Download image content from GCS
-        image_content = await gcs_service.download_image(image_hash)
         if not image_content:
             raise StorageError("Unable to retrieve image content from storage")
 
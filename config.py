@@ -7,6 +7,7 @@ class Settings:
     APP_VERSION: str = "2.0.0"
     DEBUG: bool = False
     API_V1_STR: str = "/api/v1"
+    WORKERS: int = 1  # 直接运行main.py时的工作进程数（DEBUG模式下固定为1）
     
     # Google Cloud配置
     GOOGLE_CLOUD_PROJECT_ID: str = ""
@@ -21,6 +22,13 @@ class Settings:
     REDIS_ENABLED: bool = True
     REDIS_URL: str = "redis://localhost:6379"
     CACHE_TTL_HOURS: int = 24
+    # 自适应TTL：每秒计算耗时换取的缓存秒数，结果限制在[MIN, MAX]之间
+    CACHE_TTL_SECONDS_PER_COMPUTE_SECOND: int = 1800
+    CACHE_TTL_MIN_SECONDS: int = 600
+    CACHE_TTL_MAX_SECONDS: int = 86400
+    # 超过该大小的缓存条目只保留较短时间，避免占满Redis内存
+    CACHE_LARGE_ENTRY_BYTES: int = 256 * 1024
+    CACHE_LARGE_ENTRY_TTL_SECONDS: int = 900
     
     # 速率限制配置
     RATE_LIMIT_ENABLED: bool = True
@@ -28,6 +36,9 @@ class Settings:
     # 图像哈希配置
     ENABLE_DUPLICATE_DETECTION: bool = True
     SIMILARITY_THRESHOLD: int = 5  # 汉明距离阈值
+    # 图像内容哈希算法（md5 / blake2b / blake3），输出均为32位十六进制；
+    # 该哈希即图像标识，已有数据的部署切换算法后旧图像不再被识别为重复
+    CONTENT_HASH_ALGORITHM: str = "md5"
     
     def __init__(self):
         # 简单的环境变量读取，避免pydantic复杂性
@@ -35,6 +46,7 @@ class Settings:
         self.APP_VERSION = os.getenv("APP_VERSION", self.APP_VERSION)
         self.DEBUG = os.getenv("DEBUG", "false").lower() == "true"
         self.API_V1_STR = os.getenv("API_V1_STR", self.API_V1_STR)
+        self.WORKERS = int(os.getenv("WORKERS", str(os.cpu_count() or 1)))
         
         # Google Cloud配置
         self.GOOGLE_CLOUD_PROJECT_ID = os.getenv("GOOGLE_CLOUD_PROJECT_ID", "")
@@ -45,11 +57,17 @@ class Settings:
         self.REDIS_ENABLED = os.getenv("REDIS_ENABLED", "true").lower() == "true"
         self.REDIS_URL = os.getenv("REDIS_URL", self.REDIS_URL)
         self.CACHE_TTL_HOURS = int(os.getenv("CACHE_TTL_HOURS", "24"))
+        self.CACHE_TTL_SECONDS_PER_COMPUTE_SECOND = int(os.getenv("CACHE_TTL_SECONDS_PER_COMPUTE_SECOND", "1800"))
+        self.CACHE_TTL_MIN_SECONDS = int(os.getenv("CACHE_TTL_MIN_SECONDS", "600"))
+        self.CACHE_TTL_MAX_SECONDS = int(os.getenv("CACHE_TTL_MAX_SECONDS", "86400"))
+        self.CACHE_LARGE_ENTRY_BYTES = int(os.getenv("CACHE_LARGE_ENTRY_BYTES", str(256 * 1024)))
+        self.CACHE_LARGE_ENTRY_TTL_SECONDS = int(os.getenv("CACHE_LARGE_ENTRY_TTL_SECONDS", "900"))
         
         # 功能配置
         self.RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
         self.ENABLE_DUPLICATE_DETECTION = os.getenv("ENABLE_DUPLICATE_DETECTION", "true").lower() == "true"
         self.SIMILARITY_THRESHOLD = int(os.getenv("SIMILARITY_THRESHOLD", "5"))
+        self.CONTENT_HASH_ALGORITHM = os.getenv("CONTENT_HASH_ALGORITHM", self.CONTENT_HASH_ALGORITHM).lower()
         
         # CORS配置 - 简单处理
         allowed_origins = os.getenv("ALLOWED_ORIGINS", "*")
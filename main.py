@@ -1,13 +1,23 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, Query, Request
+from fastapi import BackgroundTasks, FastAPI, File, UploadFile, HTTPException, Depends, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, Response
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
-from typing import Optional, List
+from typing import Final, Optional, List
+import asyncio
+import functools
 import io
+import logging
+import multiprocessing
+import tempfile
 import uuid
 import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from itertools import islice
+
+import orjson
 
 from config import settings
 from models.image import (
@@ -24,6 +34,8 @@ from models.image import (
     SimpleExtractionResponse,
     LabelAnalysisRequest,
     LabelAnalysisResponse,
+    LabelAnalysisResult,
+    LabelCategoryResult,
     NaturalElementsRequest,
     NaturalElementsResponse,
     AnnotatedImageRequest,
@@ -39,22 +51,74 @@ from services.enhanced_vision_service import enhanced_vision_service
 from services.image_processing_service import image_processing_service
 from services.label_analysis_service import label_analysis_service
 from services.storage_service import storage_service
-from services.cache_service import cache_service
-from services.hash_service import hash_service
+from services.cache_service import cache_params_digest, cache_service
+from services.dedup_filter import DEDUP_HEAD_SIZE, dedup_filter, near_duplicate_index
+from services.hash_service import hash_service, new_content_hasher
 from services.rate_limiter import limiter, rate_limiter_service
-from services.natural_element_analyzer import natural_element_analyzer
+from services.natural_element_analyzer import CACHE_SCHEMA_VERSION, natural_element_analyzer
 from services.image_annotation_service import image_annotation_service
 from services.batch_processing_service import batch_processing_service
 from services.performance_optimizer import get_performance_optimizer
 from services.monitoring_service import get_monitoring_service
 
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+logger = logging.getLogger(__name__)
+
+# 使用uvloop事件循环（gunicorn等未显式指定loop的启动方式也能生效）
+if uvloop is not None:
+    uvloop.install()
+
+# 与ORJSONResponse相同的编码选项（numpy数值、非字符串键），缓存的响应字节与实时响应保持一致
+JSON_DUMPS_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+# 各端点的缓存键模板（图像哈希, 参数摘要），format方法在导入时绑定
+_ENHANCED_DETECTION_KEY: Final = "enhanced_detection:{}:{}".format
+_SIMPLE_EXTRACTION_KEY: Final = "simple_extraction:{}:{}".format
+_LABEL_ANALYSIS_KEY: Final = "label_analysis:{}:{}".format
+_NATURE_ANALYSIS_KEY: Final = "nature_analysis:{}:{}".format
+# 标注结果改为存储JSON字节后更换了前缀，避免读到旧的msgpack条目
+_ANNOTATED_IMAGE_KEY: Final = "annotated_image_json:{}:{}".format
+
+# 各类端点的速率限制规则，在导入时解析一次后绑定到路由装饰器
+_UPLOAD_LIMIT: Final[str] = rate_limiter_service.get_limit_for_endpoint("upload")
+_ANALYZE_LIMIT: Final[str] = rate_limiter_service.get_limit_for_endpoint("analyze")
+_LIST_LIMIT: Final[str] = rate_limiter_service.get_limit_for_endpoint("list")
+_DELETE_LIMIT: Final[str] = rate_limiter_service.get_limit_for_endpoint("delete")
+_BATCH_LIMIT: Final[str] = rate_limiter_service.get_limit_for_endpoint("batch")
+_STATUS_LIMIT: Final[str] = rate_limiter_service.get_limit_for_endpoint("status")
+_ADMIN_LIMIT: Final[str] = rate_limiter_service.get_limit_for_endpoint("admin")
+
+# 输出格式对应的Content-Type
+_CONTENT_TYPES: Final[dict] = {
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+    "webp": "image/webp",
+}
+
+# 最近一次格式化的时间戳（秒, ISO字符串）
+_iso_timestamp_cache = (0, "")
+
+def iso_timestamp() -> str:
+    """返回当前时间的ISO字符串，同一秒内复用已格式化的结果"""
+    global _iso_timestamp_cache
+    now = int(time.time())
+    if _iso_timestamp_cache[0] != now:
+        _iso_timestamp_cache = (now, datetime.fromtimestamp(now).isoformat())
+    return _iso_timestamp_cache[1]
+
 # 创建FastAPI应用
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
     description="智能公园图像分析API - 支持哈希去重、缓存和速率限制的Google Cloud Vision图像分析服务",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # 添加速率限制支持
@@ -71,9 +135,50 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 压缩较大的JSON响应（分析结果中的颜色、季节等数组压缩率很高）
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
+async def run_cpu_bound(func, *args, **kwargs):
+    """在进程池中执行CPU密集型的图像处理，避免阻塞事件循环
+
+    进程池尚未创建时（如未触发启动事件的测试环境）退回默认线程池。
+    """
+    loop = asyncio.get_running_loop()
+    pool = getattr(app.state, "cpu_pool", None)
+    return await loop.run_in_executor(pool, functools.partial(func, *args, **kwargs))
+
+def _encode_annotated(pil_image, output_format: str, quality: int) -> bytes:
+    """将标注后的图像一次性编码为目标格式（同步函数，在线程池中执行）"""
+    output_buffer = io.BytesIO()
+    if output_format == "png":
+        pil_image.save(output_buffer, format='PNG')
+    elif output_format == "jpg":
+        from PIL import Image
+        
+        # Convert to RGB for JPEG (remove alpha channel)
+        if pil_image.mode in ('RGBA', 'LA'):
+            pil_image = pil_image.convert('RGBA')
+            if pil_image.getextrema()[3][0] < 255:
+                # Composite onto white; alpha_composite has a vectorized
+                # kernel, unlike paste(mask=...)
+                background = Image.new('RGBA', pil_image.size, (255, 255, 255, 255))
+                pil_image = Image.alpha_composite(background, pil_image)
+        if pil_image.mode != 'RGB':
+            # Fully opaque images only need the alpha channel dropped
+            pil_image = pil_image.convert('RGB')
+        pil_image.save(output_buffer, format='JPEG', quality=quality)
+    elif output_format == "webp":
+        pil_image.save(output_buffer, format='WEBP', quality=quality)
+    return output_buffer.getvalue()
+
 @app.on_event("startup")
 async def startup_event():
     """应用启动时的初始化"""
+    # 使用spawn启动子进程：主进程中已有gRPC/Redis等线程，fork后可能死锁
+    app.state.cpu_pool = ProcessPoolExecutor(
+        mp_context=multiprocessing.get_context("spawn")
+    )
+    
     try:
         await gcs_service.initialize()
         print("✅ Google Cloud Storage 初始化成功")
@@ -99,6 +204,8 @@ async def shutdown_event():
         
         await cache_service.close()
         print("✅ 缓存服务已关闭")
+        
+        app.state.cpu_pool.shutdown(wait=False, cancel_futures=True)
     except Exception as e:
         print(f"❌ 服务关闭失败: {e}")
 
@@ -109,7 +216,7 @@ async def root():
         "message": "Rethinking Park Backend API",
         "version": settings.APP_VERSION,
         "status": "running",
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": iso_timestamp(),
         "features": {
             "duplicate_detection": settings.ENABLE_DUPLICATE_DETECTION,
             "cache_enabled": settings.REDIS_ENABLED,
@@ -117,21 +224,46 @@ async def root():
         }
     }
 
+# 统计快照的有效期：频繁轮询的健康检查/统计请求共享同一份结果
+STATS_SNAPSHOT_TTL_SECONDS = 1.0
+_stats_snapshot = None  # (过期时间, (存储统计, 缓存统计))
+
+async def _collect_stats():
+    # 缓存统计需要访问Redis（同步客户端），放到线程池中与存储统计并行
+    loop = asyncio.get_running_loop()
+    return await asyncio.gather(
+        storage_service.get_stats(),
+        loop.run_in_executor(None, cache_service.get_stats),
+    )
+
+async def get_stats_snapshot():
+    """获取存储与缓存统计，1秒内的重复请求直接复用上次结果"""
+    global _stats_snapshot
+    if _stats_snapshot is not None and _stats_snapshot[0] > time.monotonic():
+        return _stats_snapshot[1]
+    
+    snapshot = await cache_service.single_flight("stats:snapshot", _collect_stats)
+    _stats_snapshot = (time.monotonic() + STATS_SNAPSHOT_TTL_SECONDS, snapshot)
+    return snapshot
+
 @app.get("/health")
 async def health_check():
     """健康检查端点"""
-    stats = await storage_service.get_stats()
-    cache_stats = cache_service.get_stats()
+    stats, cache_stats = await get_stats_snapshot()
     
     return {
         "status": "healthy",
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": iso_timestamp(),
         "storage_stats": stats,
         "cache_stats": cache_stats
     }
 
+# 上传文件按块读取；超过阈值的内容溢写到临时文件，避免整块驻留内存
+UPLOAD_CHUNK_SIZE = 1 << 20
+UPLOAD_SPOOL_MAX_SIZE = 4 * 1024 * 1024
+
 @app.post(f"{settings.API_V1_STR}/upload", response_model=ImageUploadResponse)
-@limiter.limit(rate_limiter_service.get_limit_for_endpoint("upload"))
+@limiter.limit(_UPLOAD_LIMIT)
 async def upload_image(request: Request, file: UploadFile = File(...)):
     """
     上传图像API
@@ -141,69 +273,106 @@ async def upload_image(request: Request, file: UploadFile = File(...)):
     - 返回唯一的图像哈希作为标识符
     """
     try:
-        # 读取文件内容
-        file_content = await file.read()
-        
-        # 验证图像
-        is_valid, validation_message = gcs_service.validate_image(file_content, file.filename)
-        if not is_valid:
-            raise HTTPException(status_code=400, detail=validation_message)
-        
-        # 计算图像哈希
-        md5_hash, perceptual_hash = hash_service.calculate_combined_hash(file_content)
-        
-        # 检查重复图像
-        duplicate_check = await storage_service.check_duplicates(md5_hash, perceptual_hash)
-        
-        # 如果是完全重复的图像，返回现有信息
-        if duplicate_check.is_duplicate:
-            existing_image = await storage_service.get_image_info_by_hash(md5_hash)
+        with tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_MAX_SIZE) as spool:
+            # 单次遍历上传内容：边读取边计算MD5并写入缓冲文件
+            md5_obj = new_content_hasher()
+            file_size = 0
+            head = b""
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                if not head:
+                    head = chunk[:DEDUP_HEAD_SIZE]
+                md5_obj.update(chunk)
+                spool.write(chunk)
+                file_size += len(chunk)
+                if file_size > settings.MAX_UPLOAD_SIZE:
+                    break  # 超出大小限制，交由验证步骤拒绝
+            spool.seek(0)
+            md5_hash = md5_obj.hexdigest()
+            
+            # 在线程池中验证图像，同时根据文件头部短指纹查询去重位图
+            loop = asyncio.get_running_loop()
+            dedup_offset = dedup_filter.fingerprint(head)
+            (is_valid, validation_message), probably_known = await asyncio.gather(
+                loop.run_in_executor(
+                    None, gcs_service.validate_image_file, spool, file.filename, file_size
+                ),
+                dedup_filter.maybe_known(dedup_offset),
+            )
+            if not is_valid:
+                raise HTTPException(status_code=400, detail=validation_message)
+            
+            # 可能重复时先按MD5查找，命中则复用已存储的感知哈希，无需再次解码图像
+            existing_image = None
+            if probably_known:
+                existing_image = await storage_service.get_image_info_by_hash(md5_hash)
+            
+            # 计算图像哈希
             if existing_image:
-                return ImageUploadResponse(
-                    image_id=existing_image.image_id,
-                    image_hash=md5_hash,
-                    filename=file.filename,
-                    file_size=len(file_content),
-                    content_type=file.content_type,
-                    gcs_url=existing_image.gcs_url,
-                    upload_time=existing_image.upload_time,
-                    status="duplicate",
-                    is_duplicate=True,
-                    similar_images=[img['image_hash'] for img in duplicate_check.similar_images]
+                perceptual_hash = existing_image.perceptual_hash
+            else:
+                # 缓冲文件无法跨进程传递，在线程池中解码
+                perceptual_hash = await loop.run_in_executor(
+                    None, hash_service.calculate_perceptual_hash_from_file, spool
                 )
-        
-        # 上传到GCS
-        image_id, image_hash, gcs_url, _ = await gcs_service.upload_image(
-            file_content, 
-            file.filename, 
-            file.content_type
-        )
+            
+            # 检查重复图像
+            duplicate_check = await storage_service.check_duplicates(md5_hash, perceptual_hash)
+            
+            # 如果是完全重复的图像，返回现有信息
+            if duplicate_check.is_duplicate:
+                existing_image = existing_image or await storage_service.get_image_info_by_hash(md5_hash)
+                if existing_image:
+                    await dedup_filter.mark_known(dedup_offset)
+                    return ImageUploadResponse(
+                        image_id=existing_image.image_id,
+                        image_hash=md5_hash,
+                        filename=file.filename,
+                        file_size=file_size,
+                        content_type=file.content_type,
+                        gcs_url=existing_image.gcs_url,
+                        upload_time=existing_image.upload_time,
+                        status="duplicate",
+                        is_duplicate=True,
+                        similar_images=[img['image_hash'] for img in duplicate_check.similar_images]
+                    )
+            
+            # 上传到GCS
+            image_id, image_hash, gcs_url, _ = await gcs_service.upload_image_file(
+                spool,
+                file.filename,
+                file.content_type,
+                md5_hash=md5_hash,
+                file_size=file_size,
+                perceptual_hash=perceptual_hash
+            )
         
         # 创建图像信息
+        upload_time = datetime.now()
         image_info = ImageInfo(
             image_id=image_id,
             image_hash=image_hash,
             perceptual_hash=perceptual_hash,
             filename=file.filename,
-            file_size=len(file_content),
+            file_size=file_size,
             content_type=file.content_type,
             gcs_url=gcs_url,
-            upload_time=datetime.now(),
+            upload_time=upload_time,
             processed=False
         )
         
         # 保存到本地存储
         await storage_service.save_image_info(image_info)
+        await dedup_filter.mark_known(dedup_offset)
         
         # 返回响应
         return ImageUploadResponse(
             image_id=image_id,
             image_hash=image_hash,
             filename=file.filename,
-            file_size=len(file_content),
+            file_size=file_size,
             content_type=file.content_type,
             gcs_url=gcs_url,
-            upload_time=datetime.now(),
+            upload_time=upload_time,
             status="uploaded",
             is_duplicate=False,
             similar_images=[img['image_hash'] for img in duplicate_check.similar_images]
@@ -215,7 +384,7 @@ async def upload_image(request: Request, file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=f"上传失败: {str(e)}")
 
 @app.post(f"{settings.API_V1_STR}/analyze", response_model=ImageAnalysisResponse)
-@limiter.limit(rate_limiter_service.get_limit_for_endpoint("analyze"))
+@limiter.limit(_ANALYZE_LIMIT)
 async def analyze_image(request: Request, analysis_request: ImageAnalysisRequest):
     """
     图像分析API（基于哈希）
@@ -227,26 +396,28 @@ async def analyze_image(request: Request, analysis_request: ImageAnalysisRequest
         image_hash = analysis_request.image_hash
         analysis_type = analysis_request.analysis_type
         
-        # 检查缓存（除非强制刷新）
+        # 缓存查询（除非强制刷新）与图像信息、内容获取一并发出，命中缓存时丢弃后两者
+        lookups = [
+            storage_service.get_image_info_by_hash(image_hash),
+            gcs_service.download_image(image_hash),
+        ]
         if not analysis_request.force_refresh:
-            cached_result = await cache_service.get_analysis_result(image_hash, analysis_type)
-            if cached_result:
-                return ImageAnalysisResponse(
-                    image_hash=image_hash,
-                    analysis_type=analysis_type,
-                    results=cached_result["result"],
-                    processed_time=datetime.fromisoformat(cached_result["cached_at"]),
-                    success=True,
-                    from_cache=True
-                )
+            lookups.append(cache_service.get_analysis_result(image_hash, analysis_type))
+        image_info, image_content, *cached = await asyncio.gather(*lookups)
+        
+        cached_result = cached[0] if cached else None
+        if cached_result:
+            return ImageAnalysisResponse(
+                image_hash=image_hash,
+                analysis_type=analysis_type,
+                results=cached_result["result"],
+                processed_time=datetime.fromisoformat(cached_result["cached_at"]),
+                success=True,
+                from_cache=True
+            )
         
-        # 获取图像信息
-        image_info = await storage_service.get_image_info_by_hash(image_hash)
         if not image_info:
             raise HTTPException(status_code=404, detail="图像未找到")
-        
-        # 从GCS下载图像内容进行分析
-        image_content = await gcs_service.download_image(image_hash)
         if not image_content:
             raise HTTPException(status_code=404, detail="无法获取图像内容")
         
@@ -277,7 +448,7 @@ async def analyze_image(request: Request, analysis_request: ImageAnalysisRequest
         raise HTTPException(status_code=500, detail=f"分析失败: {str(e)}")
 
 @app.post(f"{settings.API_V1_STR}/analyze-by-id", response_model=ImageAnalysisResponse)
-@limiter.limit(rate_limiter_service.get_limit_for_endpoint("analyze"))
+@limiter.limit(_ANALYZE_LIMIT)
 async def analyze_image_by_id(request: Request, analysis_request: HashAnalysisRequest):
     """
     图像分析API（基于ID，向后兼容）
@@ -304,7 +475,7 @@ async def analyze_image_by_id(request: Request, analysis_request: HashAnalysisRe
         raise HTTPException(status_code=500, detail=f"分析失败: {str(e)}")
 
 @app.get(f"{settings.API_V1_STR}/image/{{image_hash}}", response_model=ImageInfo)
-@limiter.limit(rate_limiter_service.get_limit_for_endpoint("list"))
+@limiter.limit(_LIST_LIMIT)
 async def get_image_info_by_hash(request: Request, image_hash: str):
     """根据哈希值获取图像信息"""
     image_info = await storage_service.get_image_info_by_hash(image_hash)
@@ -313,7 +484,7 @@ async def get_image_info_by_hash(request: Request, image_hash: str):
     return image_info
 
 @app.get(f"{settings.API_V1_STR}/check-duplicate/{{image_hash}}", response_model=DuplicateCheckResponse)
-@limiter.limit(rate_limiter_service.get_limit_for_endpoint("list"))
+@limiter.limit(_LIST_LIMIT)
 async def check_duplicate(request: Request, image_hash: str):
     """检查图像是否重复"""
     # 首先尝试获取图像信息以获取感知哈希
@@ -323,7 +494,7 @@ async def check_duplicate(request: Request, image_hash: str):
     return await storage_service.check_duplicates(image_hash, perceptual_hash)
 
 @app.get(f"{settings.API_V1_STR}/images", response_model=List[ImageInfo])
-@limiter.limit(rate_limiter_service.get_limit_for_endpoint("list"))
+@limiter.limit(_LIST_LIMIT)
 async def list_images(
     request: Request,
     limit: int = Query(default=10, le=100, description="返回的图像数量"),
@@ -333,11 +504,11 @@ async def list_images(
     return await storage_service.list_images(limit=limit, offset=offset)
 
 @app.delete(f"{settings.API_V1_STR}/image/{{image_hash}}")
-@limiter.limit(rate_limiter_service.get_limit_for_endpoint("delete"))
+@limiter.limit(_DELETE_LIMIT)
 async def delete_image_by_hash(request: Request, image_hash: str):
     """根据哈希值删除图像"""
     try:
-        # 从缓存删除分析结果
+        # 从缓存删除该图像的所有结果
         await cache_service.delete_analysis_result(image_hash)
         
         # 从GCS删除
@@ -355,11 +526,10 @@ async def delete_image_by_hash(request: Request, image_hash: str):
         raise HTTPException(status_code=500, detail=f"删除失败: {str(e)}")
 
 @app.get(f"{settings.API_V1_STR}/stats")
-@limiter.limit(rate_limiter_service.get_limit_for_endpoint("list"))
+@limiter.limit(_LIST_LIMIT)
 async def get_stats(request: Request):
     """获取系统统计信息"""
-    storage_stats = await storage_service.get_stats()
-    cache_stats = cache_service.get_stats()
+    storage_stats, cache_stats = await get_stats_snapshot()
     
     return {
         "storage": storage_stats,
@@ -375,7 +545,7 @@ async def get_stats(request: Request):
 # Enhanced Image Processing Endpoints
 
 @app.post(f"{settings.API_V1_STR}/detect-objects-enhanced", response_model=EnhancedDetectionResponse)
-@limiter.limit(rate_limiter_service.get_limit_for_endpoint("analyze"))
+@limiter.limit(_ANALYZE_LIMIT)
 async def detect_objects_enhanced(request: Request, detection_request: EnhancedDetectionRequest):
     """
     Enhanced object detection endpoint with face detection inclusion
@@ -389,24 +559,27 @@ async def detect_objects_enhanced(request: Request, detection_request: EnhancedD
         image_hash = detection_request.image_hash
         
         # Check cache first (unless force refresh is requested)
-        cache_key = f"enhanced_detection:{image_hash}:{detection_request.confidence_threshold}:{detection_request.include_faces}:{detection_request.include_labels}"
-        cached_result = await cache_service.get_cached_data(cache_key)
+        cache_key = _ENHANCED_DETECTION_KEY(
+            image_hash,
+            cache_params_digest(
+                (
+                    detection_request.confidence_threshold,
+                    detection_request.include_faces,
+                    detection_request.include_labels,
+                )
+            ),
+        )
+        cached_blob = await cache_service.get_raw_bytes(cache_key)
         
-        if cached_result:
-            # Return cached result with updated timestamp
-            cached_response = EnhancedDetectionResponse(**cached_result)
-            cached_response.from_cache = True
-            return cached_response
+        if cached_blob:
+            # The payload was validated on write and stored with from_cache=true,
+            # so serve the bytes as-is instead of rebuilding the response model
+            return Response(content=cached_blob, media_type="application/json")
         
-        # Get image information
-        image_info = await storage_service.get_image_info_by_hash(image_hash)
-        if not image_info:
-            raise HTTPException(status_code=404, detail="图像未找到")
-        
-        # Download image content from GCS
+        # Download image content from GCS (None doubles as the not-found check)
         image_content = await gcs_service.download_image(image_hash)
         if not image_content:
-            raise HTTPException(status_code=404, detail="无法获取图像内容")
+            raise HTTPException(status_code=404, detail="图像未找到")
         
         # Perform enhanced object detection
         detection_response = await enhanced_vision_service.detect_objects_enhanced(
@@ -418,11 +591,13 @@ async def detect_objects_enhanced(request: Request, detection_request: EnhancedD
             max_results=detection_request.max_results
         )
         
-        # Cache the result for future requests
-        await cache_service.set_cached_data(
-            cache_key, 
-            detection_response.dict(), 
-            ttl=3600  # Cache for 1 hour
+        # Cache the serialized result for future requests
+        cached_response = detection_response.model_copy(update={"from_cache": True})
+        await cache_service.set_raw_bytes(
+            cache_key,
+            orjson.dumps(cached_response.model_dump(mode="json"), option=JSON_DUMPS_OPTIONS),
+            ttl_seconds=3600,  # Cache for 1 hour
+            image_hash=image_hash
         )
         
         return detection_response
@@ -433,7 +608,7 @@ async def detect_objects_enhanced(request: Request, detection_request: EnhancedD
         raise HTTPException(status_code=500, detail=f"Enhanced detection failed: {str(e)}")
 
 @app.post(f"{settings.API_V1_STR}/extract-object-simple", response_model=SimpleExtractionResponse)
-@limiter.limit(rate_limiter_service.get_limit_for_endpoint("analyze"))
+@limiter.limit(_ANALYZE_LIMIT)
 async def extract_object_simple(request: Request, extraction_request: SimpleExtractionRequest):
     """
     Simple object extraction endpoint using bounding box coordinates
@@ -443,36 +618,47 @@ async def extract_object_simple(request: Request, extraction_request: SimpleExtr
     - Stores extracted objects in GCS
     - Provides simple background removal options
     """
+    start_ns = time.perf_counter_ns()
     try:
-        start_time = datetime.now()
         image_hash = extraction_request.image_hash
         
         # Generate extraction ID
         extraction_id = f"extract_{image_hash[:8]}_{uuid.uuid4().hex[:8]}"
+        output_format = extraction_request.output_format.lower()
         
         # Check cache first
-        cache_key = f"simple_extraction:{image_hash}:{hash(str(extraction_request.bounding_box.dict()))}:{extraction_request.output_format}:{extraction_request.add_padding}"
-        cached_result = await cache_service.get_cached_data(cache_key)
+        cache_key = _SIMPLE_EXTRACTION_KEY(
+            image_hash,
+            cache_params_digest(
+                (
+                    extraction_request.bounding_box.model_dump(),
+                    output_format,
+                    extraction_request.add_padding,
+                )
+            ),
+        )
+        cached_blob = await cache_service.get_raw_bytes(cache_key)
         
-        if cached_result:
-            processing_time = int((datetime.now() - start_time).total_seconds() * 1000)
-            cached_response = SimpleExtractionResponse(**cached_result)
+        if cached_blob:
+            processing_time = (time.perf_counter_ns() - start_ns) // 1_000_000
+            cached_response = SimpleExtractionResponse.model_validate_json(cached_blob)
             cached_response.from_cache = True
             cached_response.processing_time_ms = processing_time
             return cached_response
         
-        # Get image information
-        image_info = await storage_service.get_image_info_by_hash(image_hash)
+        # Fetch image information and content concurrently
+        image_info, image_content = await asyncio.gather(
+            storage_service.get_image_info_by_hash(image_hash),
+            gcs_service.download_image(image_hash),
+        )
         if not image_info:
             raise HTTPException(status_code=404, detail="图像未找到")
-        
-        # Download image content from GCS
-        image_content = await gcs_service.download_image(image_hash)
         if not image_content:
             raise HTTPException(status_code=404, detail="无法获取图像内容")
         
         # Validate extraction request
-        validation_result = image_processing_service.validate_extraction_request(
+        validation_result = await run_cpu_bound(
+            image_processing_service.validate_extraction_request,
             image_content, extraction_request.bounding_box, extraction_request.add_padding
         )
         
@@ -483,19 +669,18 @@ async def extract_object_simple(request: Request, extraction_request: SimpleExtr
             )
         
         # Perform simple object extraction
-        extraction_result = image_processing_service.extract_by_bounding_box(
+        extraction_result = await run_cpu_bound(
+            image_processing_service.extract_by_bounding_box,
             image_content=image_content,
             bounding_box=extraction_request.bounding_box,
             padding=extraction_request.add_padding,
-            output_format=extraction_request.output_format.upper(),
+            output_format=output_format.upper(),
             background_removal=False  # Simple extraction without background removal for now
         )
         
         # Upload extracted object to GCS
-        extracted_filename = f"extracted_{extraction_id}.{extraction_request.output_format.lower()}"
-        content_type = f"image/{extraction_request.output_format.lower()}"
-        if extraction_request.output_format.lower() == "jpg":
-            content_type = "image/jpeg"
+        extracted_filename = f"extracted_{extraction_id}.{output_format}"
+        content_type = _CONTENT_TYPES[output_format]
         
         # Upload to GCS with a specific path for extracted objects
         extracted_image_id, extracted_hash, extracted_gcs_url, _ = await gcs_service.upload_image(
@@ -506,7 +691,7 @@ async def extract_object_simple(request: Request, extraction_request: SimpleExtr
         )
         
         # Create response
-        processing_time = int((datetime.now() - start_time).total_seconds() * 1000)
+        processing_time = (time.perf_counter_ns() - start_ns) // 1_000_000
         
         from models.image import SimpleExtractionResult as ResponseExtractionResult
         response_result = ResponseExtractionResult(
@@ -516,7 +701,7 @@ async def extract_object_simple(request: Request, extraction_request: SimpleExtr
             extracted_size=extraction_result.extracted_size,
             processing_method=extraction_result.processing_method,
             file_size=len(extraction_result.extracted_image_bytes),
-            format=extraction_request.output_format.lower()
+            format=output_format
         )
         
         response = SimpleExtractionResponse(
@@ -530,10 +715,11 @@ async def extract_object_simple(request: Request, extraction_request: SimpleExtr
         )
         
         # Cache the result for future requests
-        await cache_service.set_cached_data(
-            cache_key, 
-            response.dict(), 
-            ttl=7200  # Cache for 2 hours
+        await cache_service.set_raw_bytes(
+            cache_key,
+            response.model_dump_json().encode(),
+            ttl_seconds=7200,  # Cache for 2 hours
+            image_hash=image_hash
         )
         
         return response
@@ -541,7 +727,7 @@ async def extract_object_simple(request: Request, extraction_request: SimpleExtr
     except HTTPException:
         raise
     except Exception as e:
-        processing_time = int((datetime.now() - start_time).total_seconds() * 1000)
+        processing_time = (time.perf_counter_ns() - start_ns) // 1_000_000
         return SimpleExtractionResponse(
             image_hash=extraction_request.image_hash,
             extraction_id=f"failed_{uuid.uuid4().hex[:8]}",
@@ -552,8 +738,18 @@ async def extract_object_simple(request: Request, extraction_request: SimpleExtr
             error_message=f"Extraction failed: {str(e)}"
         )
 
+# 常用类别名称到内部类别的映射
+LABEL_CATEGORY_ALIASES = {
+    "plant": "vegetation",
+    "tree": "vegetation",
+    "grass": "vegetation",
+    "flower": "vegetation",
+    "building": "built_environment",
+    "structure": "built_environment",
+}
+
 @app.post(f"{settings.API_V1_STR}/analyze-by-labels", response_model=LabelAnalysisResponse)
-@limiter.limit(rate_limiter_service.get_limit_for_endpoint("analyze"))
+@limiter.limit(_ANALYZE_LIMIT)
 async def analyze_by_labels(request: Request, analysis_request: LabelAnalysisRequest):
     """
     Label-based analysis endpoint for natural element categorization
@@ -563,30 +759,37 @@ async def analyze_by_labels(request: Request, analysis_request: LabelAnalysisReq
     - Provides confidence-based coverage estimation
     - Includes natural element insights and recommendations
     """
+    start_ns = time.perf_counter_ns()
     try:
-        start_time = datetime.now()
         image_hash = analysis_request.image_hash
         
         # Check cache first
-        cache_key = f"label_analysis:{image_hash}:{hash(str(sorted(analysis_request.target_categories)))}:{analysis_request.confidence_threshold}:{analysis_request.max_labels}"
-        cached_result = await cache_service.get_cached_data(cache_key)
+        cache_key = _LABEL_ANALYSIS_KEY(
+            image_hash,
+            cache_params_digest(
+                (
+                    sorted(analysis_request.target_categories),
+                    analysis_request.confidence_threshold,
+                    analysis_request.max_labels,
+                )
+            ),
+        )
+        # Issue the cache lookup and the download together; the download is discarded on a hit
+        cached_blob, image_content = await asyncio.gather(
+            cache_service.get_raw_bytes(cache_key),
+            gcs_service.download_image(image_hash),
+        )
         
-        if cached_result:
-            processing_time = int((datetime.now() - start_time).total_seconds() * 1000)
-            cached_response = LabelAnalysisResponse(**cached_result)
+        if cached_blob:
+            processing_time = (time.perf_counter_ns() - start_ns) // 1_000_000
+            cached_response = LabelAnalysisResponse.model_validate_json(cached_blob)
             cached_response.from_cache = True
             cached_response.processing_time_ms = processing_time
             return cached_response
         
-        # Get image information
-        image_info = await storage_service.get_image_info_by_hash(image_hash)
-        if not image_info:
-            raise HTTPException(status_code=404, detail="图像未找到")
-        
-        # Download image content from GCS
-        image_content = await gcs_service.download_image(image_hash)
+        # None doubles as the not-found check
         if not image_content:
-            raise HTTPException(status_code=404, detail="无法获取图像内容")
+            raise HTTPException(status_code=404, detail="图像未找到")
         
         # Get labels from Google Vision API
         labels_response = await vision_service.analyze_image(image_content, "labels")
@@ -595,13 +798,16 @@ async def analyze_by_labels(request: Request, analysis_request: LabelAnalysisReq
         
         # Filter labels by confidence threshold
         all_labels = labels_response["labels"]
-        filtered_labels = [
-            label for label in all_labels 
-            if label.get("confidence", 0) >= analysis_request.confidence_threshold
-        ][:analysis_request.max_labels]
+        # Stop scanning once max_labels labels have passed the threshold
+        threshold = analysis_request.confidence_threshold
+        filtered_labels = list(islice(
+            (label for label in all_labels if label.get("confidence", 0) >= threshold),
+            analysis_request.max_labels,
+        ))
         
         # Perform label-based analysis
-        analysis_result = label_analysis_service.analyze_by_labels(
+        analysis_result = await run_cpu_bound(
+            label_analysis_service.analyze_by_labels,
             labels=filtered_labels,
             image_content=image_content,
             analysis_depth="comprehensive",
@@ -612,22 +818,23 @@ async def analyze_by_labels(request: Request, analysis_request: LabelAnalysisReq
         category_results = []
         categorized_elements = analysis_result.get("categorized_elements", {})
         
+        # Several target categories can map to the same internal category; total each once
+        category_totals = {}
+        
         for target_category in analysis_request.target_categories:
             category_key = target_category.lower()
-            # Map common category names to our internal categories
-            if category_key in ["plant", "tree", "grass", "flower"]:
-                category_key = "vegetation"
-            elif category_key in ["building", "structure"]:
-                category_key = "built_environment"
+            category_key = LABEL_CATEGORY_ALIASES.get(category_key, category_key)
             
             matched_labels = categorized_elements.get(category_key, [])
             
             if matched_labels:
-                total_confidence = sum(label.get("confidence", 0) for label in matched_labels)
+                total_confidence = category_totals.get(category_key)
+                if total_confidence is None:
+                    total_confidence = sum(label.get("confidence", 0) for label in matched_labels)
+                    category_totals[category_key] = total_confidence
                 average_confidence = total_confidence / len(matched_labels)
                 coverage_estimate = min(100.0, total_confidence * 20)  # Simple coverage estimation
                 
-                from models.image import LabelCategoryResult
                 category_result = LabelCategoryResult(
                     category_name=target_category,
                     matched_labels=matched_labels,
@@ -664,7 +871,6 @@ async def analyze_by_labels(request: Request, analysis_request: LabelAnalysisReq
         top_categories = [category for category, _ in top_categories if _ > 0]
         
         # Create analysis result
-        from models.image import LabelAnalysisResult
         result = LabelAnalysisResult(
             all_labels=filtered_labels,
             category_analysis=category_results,
@@ -675,12 +881,12 @@ async def analyze_by_labels(request: Request, analysis_request: LabelAnalysisReq
                 "total_labels_processed": len(filtered_labels),
                 "confidence_threshold": analysis_request.confidence_threshold,
                 "target_categories": analysis_request.target_categories,
-                "analysis_time": datetime.now().isoformat()
+                "analysis_time": iso_timestamp()
             }
         )
         
         # Create response
-        processing_time = int((datetime.now() - start_time).total_seconds() * 1000)
+        processing_time = (time.perf_counter_ns() - start_ns) // 1_000_000
         response = LabelAnalysisResponse(
             image_hash=image_hash,
             results=result,
@@ -691,10 +897,11 @@ async def analyze_by_labels(request: Request, analysis_request: LabelAnalysisReq
         )
         
         # Cache the result for future requests
-        await cache_service.set_cached_data(
-            cache_key, 
-            response.dict(), 
-            ttl=3600  # Cache for 1 hour
+        await cache_service.set_raw_bytes(
+            cache_key,
+            response.model_dump_json().encode(),
+            ttl_seconds=3600,  # Cache for 1 hour
+            image_hash=image_hash
         )
         
         return response
@@ -702,7 +909,7 @@ async def analyze_by_labels(request: Request, analysis_request: LabelAnalysisReq
     except HTTPException:
         raise
     except Exception as e:
-        processing_time = int((datetime.now() - start_time).total_seconds() * 1000)
+        processing_time = (time.perf_counter_ns() - start_ns) // 1_000_000
         return LabelAnalysisResponse(
             image_hash=analysis_request.image_hash,
             results=None,
@@ -712,9 +919,47 @@ async def analyze_by_labels(request: Request, analysis_request: LabelAnalysisReq
             error_message=f"Label analysis failed: {str(e)}"
         )
 
+# include_* flags of NaturalElementsRequest packed into a bitmask
+NATURE_INCLUDE_HEALTH = 1
+NATURE_INCLUDE_SEASONAL = 2
+NATURE_INCLUDE_COLOR = 4
+
+_NATURE_SECTION_FIELDS = (
+    (NATURE_INCLUDE_HEALTH, frozenset({"vegetation_health_score", "vegetation_health_metrics"})),
+    (NATURE_INCLUDE_SEASONAL, frozenset({"seasonal_indicators", "seasonal_analysis"})),
+    (NATURE_INCLUDE_COLOR, frozenset({"dominant_colors", "color_diversity_score"})),
+)
+
+# Result fields to drop for every possible include mask
+NATURE_EXCLUDED_SECTIONS = tuple(
+    frozenset().union(*(fields for bit, fields in _NATURE_SECTION_FIELDS if not mask & bit))
+    for mask in range(8)
+)
+
+# How long a failed analysis is served from cache before it is retried
+NATURE_ERROR_TTL_SECONDS = 60
+
+def _nature_error_payload(
+    image_hash: str, start_ns: int, error_message: str, from_cache: bool = False
+) -> dict:
+    """Failure payload with the same shape as NaturalElementsResponse, built without validation"""
+    return {
+        "image_hash": image_hash,
+        "results": None,
+        "processing_time_ms": (time.perf_counter_ns() - start_ns) // 1_000_000,
+        "success": False,
+        "from_cache": from_cache,
+        "error_message": error_message,
+        "enabled": vision_service.is_enabled(),
+    }
+
 @app.post(f"{settings.API_V1_STR}/analyze-nature", response_model=NaturalElementsResponse)
-@limiter.limit(rate_limiter_service.get_limit_for_endpoint("analyze"))
-async def analyze_nature(request: Request, analysis_request: NaturalElementsRequest):
+@limiter.limit(_ANALYZE_LIMIT)
+async def analyze_nature(
+    request: Request,
+    analysis_request: NaturalElementsRequest,
+    background_tasks: BackgroundTasks,
+):
     """
     Natural elements analysis endpoint with comprehensive health assessment
     
@@ -723,104 +968,134 @@ async def analyze_nature(request: Request, analysis_request: NaturalElementsRequ
     - Provides vegetation health metrics and seasonal analysis
     - Includes detailed recommendations for park management
     """
+    start_ns = time.perf_counter_ns()
+    include_mask = (
+        analysis_request.include_health_assessment * NATURE_INCLUDE_HEALTH
+        | analysis_request.include_seasonal_analysis * NATURE_INCLUDE_SEASONAL
+        | analysis_request.include_color_analysis * NATURE_INCLUDE_COLOR
+    )
+    image_hash = analysis_request.image_hash
+    cache_key = _NATURE_ANALYSIS_KEY(
+        image_hash,
+        cache_params_digest(
+            analysis_request.model_dump(exclude={"image_hash", "analysis_types"})
+        ),
+    )
+    error_cache_key = f"{cache_key}:err"
     try:
-        start_time = datetime.now()
-        image_hash = analysis_request.image_hash
-        
-        # Check cache first
-        cache_key = f"nature_analysis:{image_hash}:{analysis_request.analysis_depth}:{analysis_request.include_health_assessment}:{analysis_request.include_seasonal_analysis}:{analysis_request.include_color_analysis}:{analysis_request.confidence_threshold}"
-        cached_result = await cache_service.get(cache_key)
-        
-        if cached_result:
-            processing_time = int((datetime.now() - start_time).total_seconds() * 1000)
-            cached_response = NaturalElementsResponse(**cached_result)
-            cached_response.from_cache = True
-            cached_response.processing_time_ms = processing_time
-            return cached_response
-        
-        # Get image information
-        image_info = await storage_service.get_image_info_by_hash(image_hash)
-        if not image_info:
-            raise HTTPException(status_code=404, detail="图像未找到")
-        
-        # Download image content from GCS
-        image_content = await gcs_service.download_image(image_hash)
-        if not image_content:
-            raise HTTPException(status_code=404, detail="无法获取图像内容")
-        
-        # Check if Vision service is enabled
-        if not vision_service.is_enabled():
-            raise HTTPException(
-                status_code=503, 
-                detail="Vision service is not available - Google Cloud credentials not found"
-            )
-        
-        # Perform comprehensive natural elements analysis
-        analysis_result = await natural_element_analyzer.analyze_natural_elements(
-            image_content=image_content,
-            vision_client=vision_service.client,
-            analysis_depth=analysis_request.analysis_depth
+        # Check the result cache and the negative cache in a single MGET
+        cached_entry, cached_error = await cache_service.mget([cache_key, error_cache_key])
+        cached_body = await cache_service.unwrap_versioned(
+            cache_key, cached_entry, CACHE_SCHEMA_VERSION, natural_element_analyzer.config_hash
         )
         
-        # Apply confidence threshold filtering if needed
-        if analysis_request.confidence_threshold > 0.3:
-            # Filter out low-confidence elements from categories
-            filtered_categories = []
-            for category in analysis_result.element_categories:
-                if category.confidence_score >= analysis_request.confidence_threshold:
-                    filtered_categories.append(category)
-            analysis_result.element_categories = filtered_categories
-        
-        # Optionally disable certain analysis components based on request
-        if not analysis_request.include_health_assessment:
-            analysis_result.vegetation_health_score = None
-            analysis_result.vegetation_health_metrics = None
-        
-        if not analysis_request.include_seasonal_analysis:
-            analysis_result.seasonal_indicators = []
-            analysis_result.seasonal_analysis = None
+        if cached_body:
+            # Cached entries are the serialized response with from_cache already set
+            return Response(content=cached_body, media_type="application/json")
         
-        if not analysis_request.include_color_analysis:
-            analysis_result.dominant_colors = []
-            analysis_result.color_diversity_score = None
+        # A request that failed moments ago is answered without re-running the analysis
+        if cached_error:
+            return ORJSONResponse(
+                content=_nature_error_payload(
+                    image_hash, start_ns, cached_error["error_message"], from_cache=True
+                )
+            )
         
-        # Create response
-        processing_time = int((datetime.now() - start_time).total_seconds() * 1000)
-        response = NaturalElementsResponse(
-            image_hash=image_hash,
-            results=analysis_result,
-            processing_time_ms=processing_time,
-            success=True,
-            from_cache=False,
-            error_message=None,
-            enabled=True
-        )
+        async def compute_payload():
+            # Download image content from GCS (None doubles as the not-found check)
+            image_content = await gcs_service.download_image(image_hash)
+            if not image_content:
+                raise HTTPException(status_code=404, detail="图像未找到")
+            
+            # Check if Vision service is enabled
+            if not vision_service.is_enabled():
+                raise HTTPException(
+                    status_code=503, 
+                    detail="Vision service is not available - Google Cloud credentials not found"
+                )
+            
+            # Perform comprehensive natural elements analysis
+            analysis_result = await natural_element_analyzer.analyze_natural_elements(
+                image_content=image_content,
+                vision_client=vision_service.client,
+                analysis_depth=analysis_request.analysis_depth,
+                include_health=analysis_request.include_health_assessment,
+                include_seasonal=analysis_request.include_seasonal_analysis,
+                include_color=analysis_request.include_color_analysis
+            )
+            
+            # Apply confidence threshold filtering if needed
+            if analysis_request.confidence_threshold > 0.3:
+                # Filter out low-confidence elements from categories
+                filtered_categories = []
+                for category in analysis_result.element_categories:
+                    if category.confidence_score >= analysis_request.confidence_threshold:
+                        filtered_categories.append(category)
+                analysis_result = analysis_result.model_copy(
+                    update={"element_categories": filtered_categories}
+                )
+            
+            # Opted-out sections were never computed; drop their keys from the payload
+            excluded_sections = NATURE_EXCLUDED_SECTIONS[include_mask]
+            
+            # Create response
+            processing_time = (time.perf_counter_ns() - start_ns) // 1_000_000
+            response = NaturalElementsResponse(
+                image_hash=image_hash,
+                results=analysis_result,
+                processing_time_ms=processing_time,
+                success=True,
+                from_cache=False,
+                error_message=None,
+                enabled=True
+            )
+            
+            response_payload = response.model_dump(
+                mode="json", exclude={"results": excluded_sections}
+            )
+            
+            # Cache the result for future requests after the response is sent
+            background_tasks.add_task(
+                cache_service.set_versioned,
+                cache_key,
+                orjson.dumps(
+                    {**response_payload, "from_cache": True}, option=JSON_DUMPS_OPTIONS
+                ),
+                CACHE_SCHEMA_VERSION,
+                natural_element_analyzer.config_hash,
+                ttl_seconds=cache_service.adaptive_ttl_seconds(processing_time),
+                metric_key="natural_elements_miss",
+                image_hash=image_hash
+            )
+            
+            return response_payload
         
-        # Cache the result for future requests
-        await cache_service.set(
-            cache_key, 
-            response.dict(), 
-            ttl_hours=2  # Cache for 2 hours (longer than other endpoints due to complexity)
+        # Concurrent misses for the same key share a single analysis run
+        response_payload = await cache_service.single_flight(cache_key, compute_payload)
+        processing_time = (time.perf_counter_ns() - start_ns) // 1_000_000
+        return ORJSONResponse(
+            content={**response_payload, "processing_time_ms": processing_time}
         )
         
-        return response
-        
     except HTTPException:
         raise
     except Exception as e:
-        processing_time = int((datetime.now() - start_time).total_seconds() * 1000)
-        return NaturalElementsResponse(
-            image_hash=analysis_request.image_hash,
-            results=None,
-            processing_time_ms=processing_time,
-            success=False,
-            from_cache=False,
-            error_message=f"Natural elements analysis failed: {str(e)}",
-            enabled=vision_service.is_enabled()
+        error_message = f"Natural elements analysis failed: {e}"
+        
+        # Negative-cache the failure briefly so retries don't re-run the pipeline
+        background_tasks.add_task(
+            cache_service.set,
+            error_cache_key,
+            {"error_message": error_message},
+            ttl_seconds=NATURE_ERROR_TTL_SECONDS
+        )
+        
+        return ORJSONResponse(
+            content=_nature_error_payload(image_hash, start_ns, error_message)
         )
 
 @app.post(f"{settings.API_V1_STR}/download-annotated", response_model=AnnotatedImageResponse)
-@limiter.limit(rate_limiter_service.get_limit_for_endpoint("analyze"))
+@limiter.limit(_ANALYZE_LIMIT)
 async def download_annotated(request: Request, annotation_request: AnnotatedImageRequest):
     """
     Annotated image download endpoint
@@ -830,37 +1105,56 @@ async def download_annotated(request: Request, annotation_request: AnnotatedImag
     - Create customizable annotation styles
     - Requirements: 1.1, 1.2
     """
+    start_ns = time.perf_counter_ns()
     try:
-        start_time = datetime.now()
         image_hash = annotation_request.image_hash
         
         # Generate annotation ID
         annotation_id = f"annotated_{image_hash[:8]}_{uuid.uuid4().hex[:8]}"
         
         # Check cache first
-        cache_key = f"annotated_image:{image_hash}:{annotation_request.include_face_markers}:{annotation_request.include_object_boxes}:{annotation_request.include_labels}:{annotation_request.output_format}:{annotation_request.confidence_threshold}:{annotation_request.max_objects}"
-        if annotation_request.annotation_style:
-            cache_key += f":{hash(str(annotation_request.annotation_style.dict()))}"
+        params_digest = cache_params_digest(
+            annotation_request.model_dump(exclude={"image_hash"})
+        )
+        cache_key = _ANNOTATED_IMAGE_KEY(image_hash, params_digest)
         
-        cached_result = await cache_service.get(cache_key)
+        cached_blob = await cache_service.get_raw_bytes(cache_key)
         
-        if cached_result:
-            processing_time = int((datetime.now() - start_time).total_seconds() * 1000)
-            cached_response = AnnotatedImageResponse(**cached_result)
+        if cached_blob:
+            processing_time = (time.perf_counter_ns() - start_ns) // 1_000_000
+            cached_response = AnnotatedImageResponse.model_validate_json(cached_blob)
             cached_response.from_cache = True
             cached_response.processing_time_ms = processing_time
             return cached_response
         
-        # Get image information
-        image_info = await storage_service.get_image_info_by_hash(image_hash)
+        # Fetch image information and content concurrently
+        image_info, image_content = await asyncio.gather(
+            storage_service.get_image_info_by_hash(image_hash),
+            gcs_service.download_image(image_hash),
+        )
         if not image_info:
             raise HTTPException(status_code=404, detail="图像未找到")
-        
-        # Download image content from GCS
-        image_content = await gcs_service.download_image(image_hash)
         if not image_content:
             raise HTTPException(status_code=404, detail="无法获取图像内容")
         
+        # A visually identical upload (re-encoded, different EXIF) may already
+        # have been annotated with the same parameters
+        source_hash = await near_duplicate_index.resolve(
+            image_hash, image_info.perceptual_hash, image_content
+        )
+        if source_hash:
+            cached_blob = await cache_service.get_raw_bytes(
+                _ANNOTATED_IMAGE_KEY(source_hash, params_digest)
+            )
+            if cached_blob:
+                processing_time = (time.perf_counter_ns() - start_ns) // 1_000_000
+                cached_response = AnnotatedImageResponse.model_validate_json(cached_blob)
+                cached_response.image_hash = image_hash
+                cached_response.result.original_image_url = image_info.gcs_url
+                cached_response.from_cache = True
+                cached_response.processing_time_ms = processing_time
+                return cached_response
+        
         # Get detection results for annotation
         objects = []
         faces = []
@@ -892,7 +1186,7 @@ async def download_annotated(request: Request, annotation_request: AnnotatedImag
         # Prepare custom styles
         custom_styles = None
         if annotation_request.annotation_style:
-            custom_styles = annotation_request.annotation_style.dict()
+            custom_styles = annotation_request.annotation_style.model_dump()
         
         # Validate annotation request
         validation_result = image_annotation_service.validate_annotation_request(
@@ -907,47 +1201,37 @@ async def download_annotated(request: Request, annotation_request: AnnotatedImag
                 detail=f"Invalid annotation request: {'; '.join(validation_result['errors'])}"
             )
         
-        # Render annotated image
-        annotated_image_bytes = image_annotation_service.render_annotated_image(
-            image_content=image_content,
-            objects=objects if annotation_request.include_object_boxes else None,
-            faces=faces if annotation_request.include_face_markers else None,
-            labels=labels if annotation_request.include_labels else None,
-            include_face_markers=annotation_request.include_face_markers,
-            include_object_boxes=annotation_request.include_object_boxes,
-            include_labels=annotation_request.include_labels,
-            custom_styles=custom_styles
+        # Render annotated image in a worker thread, keeping the decoded image
+        # for size and encoding so PIL work never stalls the event loop
+        loop = asyncio.get_running_loop()
+        pil_image = await loop.run_in_executor(
+            None,
+            functools.partial(
+                image_annotation_service.render_annotated_image_pil,
+                image_content=image_content,
+                objects=objects if annotation_request.include_object_boxes else None,
+                faces=faces if annotation_request.include_face_markers else None,
+                labels=labels if annotation_request.include_labels else None,
+                include_face_markers=annotation_request.include_face_markers,
+                include_object_boxes=annotation_request.include_object_boxes,
+                include_labels=annotation_request.include_labels,
+                custom_styles=custom_styles
+            )
         )
         
+        # Get image size
+        from models.image import ImageSize
+        image_size = ImageSize(width=pil_image.width, height=pil_image.height)
+        
         # Upload annotated image to GCS
-        annotated_filename = f"annotated_{annotation_id}.{annotation_request.output_format.lower()}"
-        content_type = f"image/{annotation_request.output_format.lower()}"
-        if annotation_request.output_format.lower() == "jpg":
-            content_type = "image/jpeg"
-        
-        # Convert to requested format if not PNG
-        if annotation_request.output_format.lower() != "png":
-            from PIL import Image
-            import io
-            
-            pil_image = Image.open(io.BytesIO(annotated_image_bytes))
-            if annotation_request.output_format.lower() == "jpg":
-                # Convert to RGB for JPEG (remove alpha channel)
-                if pil_image.mode in ('RGBA', 'LA'):
-                    background = Image.new('RGB', pil_image.size, (255, 255, 255))
-                    if pil_image.mode == 'RGBA':
-                        background.paste(pil_image, mask=pil_image.split()[-1])
-                    else:
-                        background.paste(pil_image, mask=pil_image.split()[-1])
-                    pil_image = background
-                
-                output_buffer = io.BytesIO()
-                pil_image.save(output_buffer, format='JPEG', quality=annotation_request.quality)
-                annotated_image_bytes = output_buffer.getvalue()
-            elif annotation_request.output_format.lower() == "webp":
-                output_buffer = io.BytesIO()
-                pil_image.save(output_buffer, format='WEBP', quality=annotation_request.quality)
-                annotated_image_bytes = output_buffer.getvalue()
+        output_format = annotation_request.output_format.lower()
+        annotated_filename = f"annotated_{annotation_id}.{output_format}"
+        content_type = _CONTENT_TYPES[output_format]
+        
+        # Encode once, directly into the requested format
+        annotated_image_bytes = await loop.run_in_executor(
+            None, _encode_annotated, pil_image, output_format, annotation_request.quality
+        )
         
         # Upload to GCS with a specific path for annotated images
         annotated_image_id, annotated_hash, annotated_gcs_url, _ = await gcs_service.upload_image(
@@ -963,12 +1247,6 @@ async def download_annotated(request: Request, annotation_request: AnnotatedImag
             faces=faces
         )
         
-        # Get image size
-        from PIL import Image
-        pil_image = Image.open(io.BytesIO(annotated_image_bytes))
-        from models.image import ImageSize
-        image_size = ImageSize(width=pil_image.width, height=pil_image.height)
-        
         # Create response result
         from models.image import AnnotatedImageResult
         result = AnnotatedImageResult(
@@ -976,12 +1254,12 @@ async def download_annotated(request: Request, annotation_request: AnnotatedImag
             original_image_url=image_info.gcs_url,
             annotation_stats=annotation_stats,
             file_size=len(annotated_image_bytes),
-            format=annotation_request.output_format.lower(),
+            format=output_format,
             image_size=image_size
         )
         
         # Create response
-        processing_time = int((datetime.now() - start_time).total_seconds() * 1000)
+        processing_time = (time.perf_counter_ns() - start_ns) // 1_000_000
         response = AnnotatedImageResponse(
             image_hash=image_hash,
             annotation_id=annotation_id,
@@ -993,10 +1271,11 @@ async def download_annotated(request: Request, annotation_request: AnnotatedImag
         )
         
         # Cache the result for future requests
-        await cache_service.set(
+        await cache_service.set_raw_bytes(
             cache_key,
-            response.dict(),
-            ttl_hours=2  # Cache for 2 hours
+            response.model_dump_json().encode(),
+            ttl_seconds=7200,  # Cache for 2 hours
+            image_hash=image_hash
         )
         
         return response
@@ -1004,7 +1283,7 @@ async def download_annotated(request: Request, annotation_request: AnnotatedImag
     except HTTPException:
         raise
     except Exception as e:
-        processing_time = int((datetime.now() - start_time).total_seconds() * 1000)
+        processing_time = (time.perf_counter_ns() - start_ns) // 1_000_000
         return AnnotatedImageResponse(
             image_hash=annotation_request.image_hash,
             annotation_id=f"failed_{uuid.uuid4().hex[:8]}",
@@ -1018,7 +1297,7 @@ async def download_annotated(request: Request, annotation_request: AnnotatedImag
 # Batch Processing Endpoints
 
 @app.post(f"{settings.API_V1_STR}/batch-process", response_model=BatchProcessingResponse)
-@limiter.limit(rate_limiter_service.get_limit_for_endpoint("batch"))
+@limiter.limit(_BATCH_LIMIT)
 async def create_batch_job(request: Request, batch_request: BatchProcessingRequest):
     """
     Create and start a batch processing job
@@ -1073,7 +1352,7 @@ async def create_batch_job(request: Request, batch_request: BatchProcessingReque
         raise HTTPException(status_code=500, detail=f"Batch processing failed: {str(e)}")
 
 @app.get(f"{settings.API_V1_STR}/batch-process/{{batch_id}}/status", response_model=BatchJobStatus)
-@limiter.limit(rate_limiter_service.get_limit_for_endpoint("status"))
+@limiter.limit(_STATUS_LIMIT)
 async def get_batch_status(request: Request, batch_id: str):
     """
     Get the status of a batch processing job
@@ -1114,7 +1393,7 @@ async def get_batch_status(request: Request, batch_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to get batch status: {str(e)}")
 
 @app.get(f"{settings.API_V1_STR}/batch-process/{{batch_id}}/results", response_model=BatchResultsResponse)
-@limiter.limit(rate_limiter_service.get_limit_for_endpoint("status"))
+@limiter.limit(_STATUS_LIMIT)
 async def get_batch_results(request: Request, batch_id: str):
     """
     Get aggregated results from a completed batch processing job
@@ -1151,7 +1430,7 @@ async def get_batch_results(request: Request, batch_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to get batch results: {str(e)}")
 
 @app.delete(f"{settings.API_V1_STR}/batch-process/{{batch_id}}")
-@limiter.limit(rate_limiter_service.get_limit_for_endpoint("status"))
+@limiter.limit(_STATUS_LIMIT)
 async def cancel_batch_job(request: Request, batch_id: str):
     """
     Cancel a running batch processing job
@@ -1176,7 +1455,7 @@ async def cancel_batch_job(request: Request, batch_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to cancel batch job: {str(e)}")
 
 @app.get(f"{settings.API_V1_STR}/batch-process/statistics")
-@limiter.limit(rate_limiter_service.get_limit_for_endpoint("status"))
+@limiter.limit(_STATUS_LIMIT)
 async def get_batch_statistics(request: Request):
     """
     Get batch processing service statistics
@@ -1196,28 +1475,20 @@ async def get_batch_statistics(request: Request):
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """全局异常处理"""
-    return JSONResponse(
+    logger.exception("未处理的异常: %s %s", request.method, request.url.path, exc_info=exc)
+    return ORJSONResponse(
         status_code=500,
         content=ErrorResponse(
             error="internal_server_error",
             message="服务器内部错误",
-            details={"exception": str(exc)}
-        ).dict()
+            details={"exception_type": type(exc).__name__}
+        ).model_dump(mode="json")
     )
 
-if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(
-        "main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=settings.DEBUG
-    ) 
-
 # Performance Optimized Endpoints
 
 @app.post(f"{settings.API_V1_STR}/detect-objects-optimized", response_model=EnhancedDetectionResponse)
-@limiter.limit(rate_limiter_service.get_limit_for_endpoint("analyze"))
+@limiter.limit(_ANALYZE_LIMIT)
 async def detect_objects_optimized(request: Request, detection_request: EnhancedDetectionRequest):
     """
     Performance-optimized object detection endpoint with batching and caching
@@ -1230,13 +1501,13 @@ async def detect_objects_optimized(request: Request, detection_request: Enhanced
     try:
         optimizer = await get_performance_optimizer()
         
-        # Get image information
-        image_info = await storage_service.get_image_info_by_hash(detection_request.image_hash)
+        # Fetch image information and content concurrently
+        image_info, image_content = await asyncio.gather(
+            storage_service.get_image_info_by_hash(detection_request.image_hash),
+            gcs_service.download_image(detection_request.image_hash),
+        )
         if not image_info:
             raise HTTPException(status_code=404, detail="图像未找到")
-        
-        # Download image content from GCS
-        image_content = await gcs_service.download_image(detection_request.image_hash)
         if not image_content:
             raise HTTPException(status_code=404, detail="无法获取图像内容")
         
@@ -1247,7 +1518,8 @@ async def detect_objects_optimized(request: Request, detection_request: Enhanced
             confidence_threshold=detection_request.confidence_threshold,
             include_faces=detection_request.include_faces,
             include_labels=detection_request.include_labels,
-            use_batching=True
+            use_batching=True,
+            perceptual_hash=image_info.perceptual_hash
         )
         
         # Convert result to response format
@@ -1258,7 +1530,7 @@ async def detect_objects_optimized(request: Request, detection_request: Enhanced
                     objects=result.get("objects", []),
                     faces=result.get("faces", []),
                     labels=result.get("labels", []),
-                    detection_time=datetime.fromisoformat(result.get("detection_time", datetime.now().isoformat())),
+                    detection_time=result.get("detection_time") or datetime.now(),  # pydantic parses ISO strings
                     success=True,
                     enabled=result.get("enabled", True),
                     error_message=None,
@@ -1296,7 +1568,7 @@ async def detect_objects_optimized(request: Request, detection_request: Enhanced
         )
 
 @app.post(f"{settings.API_V1_STR}/analyze-nature-optimized", response_model=NaturalElementsResponse)
-@limiter.limit(rate_limiter_service.get_limit_for_endpoint("analyze"))
+@limiter.limit(_ANALYZE_LIMIT)
 async def analyze_nature_optimized(request: Request, analysis_request: NaturalElementsRequest):
     """
     Performance-optimized natural elements analysis with batching
@@ -1305,17 +1577,17 @@ async def analyze_nature_optimized(request: Request, analysis_request: NaturalEl
     - Memory usage optimization for image annotation processing
     - Async processing for batch operations
     """
+    start_ns = time.perf_counter_ns()
     try:
-        start_time = datetime.now()
         optimizer = await get_performance_optimizer()
         
-        # Get image information
-        image_info = await storage_service.get_image_info_by_hash(analysis_request.image_hash)
+        # Fetch image information and content concurrently
+        image_info, image_content = await asyncio.gather(
+            storage_service.get_image_info_by_hash(analysis_request.image_hash),
+            gcs_service.download_image(analysis_request.image_hash),
+        )
         if not image_info:
             raise HTTPException(status_code=404, detail="图像未找到")
-        
-        # Download image content from GCS
-        image_content = await gcs_service.download_image(analysis_request.image_hash)
         if not image_content:
             raise HTTPException(status_code=404, detail="无法获取图像内容")
         
@@ -1324,11 +1596,12 @@ async def analyze_nature_optimized(request: Request, analysis_request: NaturalEl
             image_content=image_content,
             image_hash=analysis_request.image_hash,
             analysis_depth=analysis_request.analysis_depth,
-            use_batching=True
+            use_batching=True,
+            perceptual_hash=image_info.perceptual_hash
         )
         
         # Convert result to response format
-        processing_time = int((datetime.now() - start_time).total_seconds() * 1000)
+        processing_time = (time.perf_counter_ns() - start_ns) // 1_000_000
         
         if isinstance(result, dict):
             # Create NaturalElementsResult from the analysis result
@@ -1371,7 +1644,7 @@ async def analyze_nature_optimized(request: Request, analysis_request: NaturalEl
     except HTTPException:
         raise
     except Exception as e:
-        processing_time = int((datetime.now() - start_time).total_seconds() * 1000)
+        processing_time = (time.perf_counter_ns() - start_ns) // 1_000_000
         return NaturalElementsResponse(
             image_hash=analysis_request.image_hash,
             results=None,
@@ -1382,7 +1655,7 @@ async def analyze_nature_optimized(request: Request, analysis_request: NaturalEl
         )
 
 @app.post(f"{settings.API_V1_STR}/batch-process-optimized", response_model=BatchProcessingResponse)
-@limiter.limit(rate_limiter_service.get_limit_for_endpoint("batch"))
+@limiter.limit(_BATCH_LIMIT)
 async def batch_process_optimized(request: Request, batch_request: BatchProcessingRequest):
     """
     Performance-optimized batch processing with async queue management
@@ -1403,7 +1676,7 @@ async def batch_process_optimized(request: Request, batch_request: BatchProcessi
         
         # Use optimized batch processing
         batch_id = await optimizer.optimize_batch_processing(
-            operations=[op.dict() for op in batch_request.operations],
+            operations=[op.model_dump() for op in batch_request.operations],
             max_concurrent=min(batch_request.max_concurrent_operations, 10)
         )
         
@@ -1429,7 +1702,7 @@ async def batch_process_optimized(request: Request, batch_request: BatchProcessi
         raise HTTPException(status_code=500, detail=f"Optimized batch processing failed: {str(e)}")
 
 @app.get(f"{settings.API_V1_STR}/performance-metrics")
-@limiter.limit(rate_limiter_service.get_limit_for_endpoint("list"))
+@limiter.limit(_LIST_LIMIT)
 async def get_performance_metrics(request: Request):
     """
     Get comprehensive performance optimization metrics
@@ -1448,7 +1721,7 @@ async def get_performance_metrics(request: Request):
         
         # Combine metrics
         comprehensive_metrics = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": iso_timestamp(),
             "optimization_metrics": metrics,
             "cache_metrics": cache_stats,
             "system_info": {
@@ -1464,7 +1737,7 @@ async def get_performance_metrics(request: Request):
         raise HTTPException(status_code=500, detail=f"Failed to get performance metrics: {str(e)}")
 
 @app.post(f"{settings.API_V1_STR}/optimize-performance")
-@limiter.limit(rate_limiter_service.get_limit_for_endpoint("admin"))
+@limiter.limit(_ADMIN_LIMIT)
 async def trigger_performance_optimization(request: Request):
     """
     Manually trigger performance optimization cycle
@@ -1480,7 +1753,7 @@ async def trigger_performance_optimization(request: Request):
         return {
             "message": "Performance optimization cycle completed",
             "results": optimization_results,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": iso_timestamp()
         }
         
     except Exception as e:
@@ -1489,7 +1762,7 @@ async def trigger_performance_optimization(request: Request):
 # Production Monitoring and Health Check Endpoints
 
 @app.get(f"{settings.API_V1_STR}/health-detailed")
-@limiter.limit(rate_limiter_service.get_limit_for_endpoint("list"))
+@limiter.limit(_LIST_LIMIT)
 async def get_detailed_health_status(request: Request):
     """
     Comprehensive health check endpoint for production monitoring
@@ -1508,14 +1781,14 @@ async def get_detailed_health_status(request: Request):
     except Exception as e:
         return {
             "status": "unhealthy",
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": iso_timestamp(),
             "error": f"Health check failed: {str(e)}",
             "checks": {},
             "uptime_seconds": 0
         }
 
 @app.get(f"{settings.API_V1_STR}/metrics")
-@limiter.limit(rate_limiter_service.get_limit_for_endpoint("list"))
+@limiter.limit(_LIST_LIMIT)
 async def get_system_metrics(request: Request):
     """
     System and API metrics endpoint for monitoring
@@ -1533,7 +1806,7 @@ async def get_system_metrics(request: Request):
         
     except Exception as e:
         return {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": iso_timestamp(),
             "error": f"Metrics collection failed: {str(e)}",
             "system": {},
             "api": {},
@@ -1541,7 +1814,7 @@ async def get_system_metrics(request: Request):
         }
 
 @app.get(f"{settings.API_V1_STR}/vision-api-metrics")
-@limiter.limit(rate_limiter_service.get_limit_for_endpoint("list"))
+@limiter.limit(_LIST_LIMIT)
 async def get_vision_api_metrics(request: Request):
     """
     Google Cloud Vision API usage metrics
@@ -1560,7 +1833,7 @@ async def get_vision_api_metrics(request: Request):
         performance_metrics = optimizer.get_performance_metrics()
         
         vision_metrics = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": iso_timestamp(),
             "vision_api_calls": api_metrics.vision_api_calls,
             "api_optimization": {
                 "batched_calls": performance_metrics["api_calls"]["batched"],
@@ -1582,7 +1855,7 @@ async def get_vision_api_metrics(request: Request):
         
     except Exception as e:
         return {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": iso_timestamp(),
             "error": f"Vision API metrics collection failed: {str(e)}",
             "vision_api_calls": 0,
             "service_status": {
@@ -1593,7 +1866,7 @@ async def get_vision_api_metrics(request: Request):
         }
 
 @app.get(f"{settings.API_V1_STR}/cache-metrics")
-@limiter.limit(rate_limiter_service.get_limit_for_endpoint("list"))
+@limiter.limit(_LIST_LIMIT)
 async def get_cache_metrics(request: Request):
     """
     Cache performance metrics endpoint
@@ -1618,7 +1891,7 @@ async def get_cache_metrics(request: Request):
         cache_performance = performance_metrics.get("cache_performance", {})
         
         combined_metrics = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": iso_timestamp(),
             "basic_stats": cache_stats,
             "detailed_stats": detailed_stats,
             "performance_metrics": cache_performance,
@@ -1633,7 +1906,7 @@ async def get_cache_metrics(request: Request):
         
     except Exception as e:
         return {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": iso_timestamp(),
             "error": f"Cache metrics collection failed: {str(e)}",
             "basic_stats": {"enabled": False},
             "optimization_status": {
@@ -1644,7 +1917,7 @@ async def get_cache_metrics(request: Request):
         }
 
 @app.get(f"{settings.API_V1_STR}/batch-metrics")
-@limiter.limit(rate_limiter_service.get_limit_for_endpoint("list"))
+@limiter.limit(_LIST_LIMIT)
 async def get_batch_processing_metrics(request: Request):
     """
     Batch processing metrics endpoint
@@ -1670,7 +1943,7 @@ async def get_batch_processing_metrics(request: Request):
         api_metrics = monitoring.metrics_collector.get_api_metrics()
         
         batch_metrics = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": iso_timestamp(),
             "active_batch_operations": api_metrics.batch_operations_active,
             "async_processing": async_processing,
             "batch_service_stats": batch_stats,
@@ -1685,7 +1958,7 @@ async def get_batch_processing_metrics(request: Request):
         
     except Exception as e:
         return {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": iso_timestamp(),
             "error": f"Batch metrics collection failed: {str(e)}",
             "active_batch_operations": 0,
             "optimization_status": {
@@ -1696,7 +1969,7 @@ async def get_batch_processing_metrics(request: Request):
         }
 
 @app.post(f"{settings.API_V1_STR}/trigger-optimization")
-@limiter.limit(rate_limiter_service.get_limit_for_endpoint("admin"))
+@limiter.limit(_ADMIN_LIMIT)
 async def trigger_system_optimization(request: Request):
     """
     Manually trigger system optimization cycle
@@ -1718,7 +1991,7 @@ async def trigger_system_optimization(request: Request):
         
         return {
             "message": "System optimization cycle completed successfully",
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": iso_timestamp(),
             "optimization_results": optimization_results,
             "cache_optimization": cache_optimization,
             "status": "success"
@@ -1727,7 +2000,7 @@ async def trigger_system_optimization(request: Request):
     except Exception as e:
         return {
             "message": "System optimization cycle failed",
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": iso_timestamp(),
             "error": str(e),
             "status": "failed"
         }
@@ -1763,7 +2036,7 @@ async def shutdown_monitoring():
 @app.middleware("http")
 async def record_api_metrics(request: Request, call_next):
     """Middleware to record API request metrics"""
-    start_time = time.time()
+    start_ns = time.perf_counter_ns()
     
     try:
         # Get monitoring service
@@ -1773,7 +2046,7 @@ async def record_api_metrics(request: Request, call_next):
         response = await call_next(request)
         
         # Calculate response time
-        response_time_ms = (time.time() - start_time) * 1000
+        response_time_ms = (time.perf_counter_ns() - start_ns) / 1_000_000
         
         # Record metrics
         success = 200 <= response.status_code < 400
@@ -1790,7 +2063,7 @@ async def record_api_metrics(request: Request, call_next):
         
     except Exception as e:
         # Record failed request
-        response_time_ms = (time.time() - start_time) * 1000
+        response_time_ms = (time.perf_counter_ns() - start_ns) / 1_000_000
         try:
             monitoring = await get_monitoring_service()
             monitoring.metrics_collector.record_request(
@@ -1801,4 +2074,18 @@ async def record_api_metrics(request: Request, call_next):
             pass  # Don't fail if monitoring fails
         
         # Re-raise the original exception
-        raise e
\ No newline at end of file
+        raise e
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        reload=settings.DEBUG,
+        workers=1 if settings.DEBUG else settings.WORKERS,
+        loop="uvloop",
+        http="httptools",
+        log_level="debug" if settings.DEBUG else "warning",
+        access_log=settings.DEBUG
+    )
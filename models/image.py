@@ -2,7 +2,7 @@ import uuid
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class ImageUploadResponse(BaseModel):
@@ -198,6 +198,8 @@ class NaturalElementCategory(BaseModel):
 class NaturalElementsResult(BaseModel):
     """自然元素分析结果模型"""
 
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     # Coverage statistics
     vegetation_coverage: float = Field(
         ..., description="植被覆盖率百分比", ge=0.0, le=100.0
@@ -274,6 +276,8 @@ class NaturalElementsRequest(BaseModel):
 class NaturalElementsResponse(BaseModel):
     """自然元素分析响应模型"""
 
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     image_hash: str = Field(..., description="图像哈希值")
     results: Optional[NaturalElementsResult] = Field(
         default=None, description="分析结果"
@@ -428,7 +432,9 @@ class LabelAnalysisResponse(BaseModel):
     """基于标签的分析响应模型"""
 
     image_hash: str = Field(..., description="图像哈希值")
-    results: LabelAnalysisResult = Field(..., description="分析结果")
+    results: Optional[LabelAnalysisResult] = Field(
+        default=None, description="分析结果"
+    )
     processing_time_ms: int = Field(..., description="处理时间（毫秒）")
     success: bool = Field(default=True, description="分析是否成功")
     from_cache: bool = Field(default=False, description="结果是否来自缓存")
@@ -592,6 +598,8 @@ class BatchResultsResponse(BaseModel):
 class ErrorResponse(BaseModel):
     """错误响应模型"""
 
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     error: str = Field(..., description="错误类型")
     message: str = Field(..., description="错误信息")
     details: Optional[Dict[str, Any]] = Field(default=None, description="错误详情")
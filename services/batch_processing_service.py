@@ -548,9 +548,9 @@ class BatchProcessingService:
         # Return result in expected format
         return {
             "extracted_image_url": extracted_gcs_url,
-            "bounding_box": result.bounding_box.dict(),
-            "original_size": result.original_size.dict(),
-            "extracted_size": result.extracted_size.dict(),
+            "bounding_box": result.bounding_box.model_dump(),
+            "original_size": result.original_size.model_dump(),
+            "extracted_size": result.extracted_size.model_dump(),
             "processing_method": result.processing_method,
             "file_size": len(result.extracted_image_bytes),
             "format": output_format.lower(),
@@ -619,7 +619,7 @@ class BatchProcessingService:
         )
 
         # Convert result to dict for serialization
-        return result.dict() if hasattr(result, "dict") else result
+        return result.model_dump() if hasattr(result, "model_dump") else result
 
     async def _handle_annotate_image(
         self, image_hash: str, parameters: Dict[str, Any]
@@ -692,7 +692,7 @@ class BatchProcessingService:
             "annotation_stats": annotation_stats,
             "file_size": len(annotated_image_bytes),
             "format": output_format.lower(),
-            "image_size": image_size.dict(),
+            "image_size": image_size.model_dump(),
         }
 
     async def get_batch_status(self, batch_id: str) -> Optional[Dict[str, Any]]:
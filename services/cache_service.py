@@ -1,13 +1,22 @@
+import asyncio
 import hashlib
-import json
 import logging
 import threading
 import time
+import zlib
 from collections import OrderedDict
-from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 
+import msgpack
+import orjson
 import redis
+from pydantic import BaseModel
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 from app.core.error_monitoring import (
     ErrorRecovery,
@@ -20,14 +29,152 @@ from config import settings
 
 logger = logging.getLogger(__name__)
 
+# 并发Redis写入上限（后台写入不等待结果，需避免无限堆积）
+CACHE_WRITE_CONCURRENCY = 64
+
+# 缓存写入统计计数所在的Redis哈希
+CACHE_STATS_KEY = "stats:cache"
+
+# 每张图像的缓存键索引（Redis集合），删除图像时据此一次性清除其所有缓存
+IMAGE_KEYS_PREFIX = "img_keys:"
+# 索引随每次写入续期，取最长的结果缓存时间（抠图结果30天）
+IMAGE_KEYS_TTL_SECONDS = 30 * 24 * 3600
+
+# 进程内一级缓存：容量与条目最长存活时间
+LOCAL_CACHE_MAX_ENTRIES = 2048
+LOCAL_CACHE_TTL_SECONDS = 120
+
+# 缓存编码版本前缀：不带该前缀的旧条目（JSON）读取时视为未命中并清除
+CACHE_CODEC_MSGPACK = b"\x01"
+# 较大的条目压缩后存储：优先使用zstd，未安装zstandard时退回zlib
+CACHE_CODEC_ZSTD = b"\x02"
+CACHE_CODEC_ZLIB = b"\x03"
+
+# 超过该大小的缓存条目才压缩（小条目压缩收益低于CPU开销）
+CACHE_COMPRESS_MIN_BYTES = 4096
+CACHE_ZSTD_LEVEL = 3
+CACHE_ZLIB_LEVEL = 1
+
+
+def cache_params_digest(params: Any) -> str:
+    """计算请求参数的稳定摘要（与进程无关，键顺序不影响结果）"""
+    return hashlib.blake2b(
+        orjson.dumps(params, option=orjson.OPT_SORT_KEYS), digest_size=8
+    ).hexdigest()
+
+
+def _msgpack_default(value: Any) -> Any:
+    """msgpack无法直接编码的类型转换"""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"无法序列化类型: {type(value).__name__}")
+
+
+def compress_cache_bytes(data: bytes) -> Optional[bytes]:
+    """压缩较大的缓存数据并加上编码前缀，数据较小时返回None"""
+    if len(data) <= CACHE_COMPRESS_MIN_BYTES:
+        return None
+    if zstandard is not None:
+        return CACHE_CODEC_ZSTD + zstandard.ZstdCompressor(
+            level=CACHE_ZSTD_LEVEL
+        ).compress(data)
+    return CACHE_CODEC_ZLIB + zlib.compress(data, CACHE_ZLIB_LEVEL)
+
+
+def decompress_cache_bytes(data: bytes) -> Optional[bytes]:
+    """解压带压缩前缀的缓存数据，未压缩或无法解压时返回None"""
+    if data.startswith(CACHE_CODEC_ZSTD):
+        if zstandard is None:
+            return None
+        return zstandard.ZstdDecompressor().decompress(data[1:])
+    if data.startswith(CACHE_CODEC_ZLIB):
+        return zlib.decompress(data[1:])
+    return None
+
+
+def pack_cache_value(value: Any) -> bytes:
+    """将缓存值编码为msgpack字节（不含编码前缀）"""
+    return msgpack.packb(value, default=_msgpack_default, use_bin_type=True)
+
+
+def frame_cache_bytes(packed: bytes) -> bytes:
+    """为msgpack字节加上编码前缀，较大的条目会被压缩"""
+    return compress_cache_bytes(packed) or CACHE_CODEC_MSGPACK + packed
+
+
+def _frame_raw_bytes(value: bytes) -> bytes:
+    """原始字节条目：较大的数据压缩存储，其余原样存储"""
+    return compress_cache_bytes(value) or value
+
+
+def encode_cache_value(value: Any) -> bytes:
+    """将缓存值编码为带版本前缀的msgpack字节，较大的条目会被压缩"""
+    return frame_cache_bytes(pack_cache_value(value))
+
+
+def decode_cache_value(data: bytes) -> Optional[Any]:
+    """解码缓存字节，编码版本不匹配时返回None"""
+    if data.startswith(CACHE_CODEC_MSGPACK):
+        return msgpack.unpackb(data[1:], raw=False)
+
+    packed = decompress_cache_bytes(data)
+    if packed is None:
+        return None
+    return msgpack.unpackb(packed, raw=False)
+
+
+class LocalTTLCache:
+    """进程内带过期时间的LRU缓存（仅在事件循环线程中访问）"""
+
+    def __init__(self, maxsize: int, ttl_seconds: float):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl_seconds: float = None) -> None:
+        ttl = (
+            self.ttl_seconds
+            if ttl_seconds is None
+            else min(ttl_seconds, self.ttl_seconds)
+        )
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
 
 class CacheService:
     """Enhanced Redis caching service for image processing results"""
 
     def __init__(self):
         self.redis_client = None
+        self.raw_client = None
         self.enabled = False
         self._lock = threading.Lock()
+        self._write_semaphore = asyncio.Semaphore(CACHE_WRITE_CONCURRENCY)
+        self._local = LocalTTLCache(LOCAL_CACHE_MAX_ENTRIES, LOCAL_CACHE_TTL_SECONDS)
+        self._inflight: Dict[str, asyncio.Future] = {}
 
         # Cache configuration for different result types
         self.cache_config = {
@@ -46,6 +193,8 @@ class CacheService:
             "misses": 0,
             "evictions": 0,
             "total_operations": 0,
+            "l1_hits": 0,
+            "l2_hits": 0,
         }
 
         if settings.REDIS_ENABLED:
@@ -54,6 +203,9 @@ class CacheService:
                 redis_url = settings.REDIS_URL
                 self.redis_client = redis.from_url(redis_url, decode_responses=True)
 
+                # 原始字节客户端（不解码响应），用于直接返回已序列化的JSON
+                self.raw_client = redis.from_url(redis_url)
+
                 # 测试连接
                 self.redis_client.ping()
                 self.enabled = True
@@ -69,31 +221,201 @@ class CacheService:
         """检查缓存服务是否可用"""
         return self.enabled
 
-    async def get(self, key: str) -> Optional[Any]:
-        """从缓存获取数据"""
+    async def get(self, key: str, use_local: bool = True) -> Optional[Any]:
+        """从缓存获取数据（先查进程内缓存，再查Redis）
+
+        返回值可能与其他请求共享，调用方不应原地修改。
+        use_local=False时跳过进程内缓存，直接读取Redis。
+        """
         if not self.enabled:
             return None
 
+        value = self._local.get(key) if use_local else None
+        if value is not None:
+            with self._lock:
+                self.cache_stats["l1_hits"] += 1
+            return value
+
         try:
-            data = self.redis_client.get(key)
-            if data:
-                return json.loads(data)
-            return None
+            data = self.raw_client.get(key)
+            if not data:
+                return None
+
+            value = decode_cache_value(data)
+            if value is None:
+                # 旧编码格式的条目，直接清除
+                self.raw_client.delete(key)
+                return None
+
+            with self._lock:
+                self.cache_stats["l2_hits"] += 1
+            self._local.set(key, value)
+            return value
         except Exception as e:
             logger.error(f"缓存读取失败: {e}")
             return None
 
-    async def set(self, key: str, value: Any, ttl_hours: int = None) -> bool:
-        """设置缓存数据"""
+    async def mget(
+        self, keys: List[str], use_local: bool = True
+    ) -> List[Optional[Any]]:
+        """批量获取缓存数据，进程内缓存未命中的键通过一次MGET往返读取"""
+        if not self.enabled or not keys:
+            return [None] * len(keys)
+
+        values = [self._local.get(key) if use_local else None for key in keys]
+        missing = [i for i, value in enumerate(values) if value is None]
+        with self._lock:
+            self.cache_stats["l1_hits"] += len(keys) - len(missing)
+        if not missing:
+            return values
+
+        try:
+            blobs = self.raw_client.mget([keys[i] for i in missing])
+        except Exception as e:
+            logger.error(f"缓存批量读取失败: {e}")
+            return values
+
+        legacy_keys = []
+        for i, data in zip(missing, blobs):
+            if not data:
+                continue
+            value = decode_cache_value(data)
+            if value is None:
+                legacy_keys.append(keys[i])
+                continue
+            values[i] = value
+            self._local.set(keys[i], value)
+            with self._lock:
+                self.cache_stats["l2_hits"] += 1
+
+        if legacy_keys:
+            # 旧编码格式的条目，直接清除
+            try:
+                self.raw_client.delete(*legacy_keys)
+            except Exception as e:
+                logger.error(f"清除旧缓存条目失败: {e}")
+
+        return values
+
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ttl_hours: int = None,
+        ttl_seconds: int = None,
+        image_hash: str = None,
+    ) -> bool:
+        """设置缓存数据（支持直接传入Pydantic模型）
+
+        ttl_seconds优先于ttl_hours；编码后超过CACHE_LARGE_ENTRY_BYTES的条目
+        TTL会被缩短为CACHE_LARGE_ENTRY_TTL_SECONDS。
+        指定image_hash时将该键登记到图像的缓存键索引中。
+        """
+        if ttl_seconds is None:
+            ttl_hours = ttl_hours or settings.CACHE_TTL_HOURS
+            ttl_seconds = ttl_hours * 3600
+        return await self._write_entry(key, value, ttl_seconds, image_hash=image_hash)
+
+    async def set_with_metric(
+        self,
+        key: str,
+        value: Any,
+        ttl_seconds: int,
+        metric_key: str,
+        image_hash: str = None,
+    ) -> bool:
+        """设置缓存数据，并在同一个pipeline中累加统计计数"""
+        return await self._write_entry(
+            key, value, ttl_seconds, metric_key, image_hash=image_hash
+        )
+
+    async def _write_entry(
+        self,
+        key: str,
+        value: Any,
+        ttl_seconds: int,
+        metric_key: str = None,
+        image_hash: str = None,
+    ) -> bool:
         if not self.enabled:
             return False
 
         try:
-            ttl_hours = ttl_hours or settings.CACHE_TTL_HOURS
-            ttl = timedelta(hours=ttl_hours)
+            packed = pack_cache_value(value)
+            if len(packed) > settings.CACHE_LARGE_ENTRY_BYTES:
+                ttl_seconds = min(ttl_seconds, settings.CACHE_LARGE_ENTRY_TTL_SECONDS)
+
+            # 以解码后的形式放入一级缓存，与从Redis读取的结果保持一致
+            self._local.set(key, msgpack.unpackb(packed, raw=False), ttl_seconds)
+
+            async with self._write_semaphore:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(
+                    None,
+                    self._store_entry,
+                    key,
+                    frame_cache_bytes,
+                    packed,
+                    ttl_seconds,
+                    metric_key,
+                    image_hash,
+                )
+            return True
+        except Exception as e:
+            logger.error(f"缓存写入失败: {e}")
+            return False
 
-            serialized_value = json.dumps(value, ensure_ascii=False)
-            self.redis_client.setex(key, ttl, serialized_value)
+    def _store_entry(
+        self,
+        key: str,
+        frame: Callable[[bytes], bytes],
+        payload: bytes,
+        ttl_seconds: int,
+        metric_key: Optional[str] = None,
+        image_hash: Optional[str] = None,
+    ) -> None:
+        # 在线程池中加前缀/压缩，避免占用事件循环
+        data = frame(payload)
+        if metric_key is None and image_hash is None:
+            self.raw_client.setex(key, ttl_seconds, data)
+            return
+
+        # 写入、计数与索引登记合并为一次往返
+        pipe = self.raw_client.pipeline(transaction=False)
+        pipe.setex(key, ttl_seconds, data)
+        if metric_key is not None:
+            pipe.hincrby(CACHE_STATS_KEY, metric_key, 1)
+        if image_hash is not None:
+            index_key = IMAGE_KEYS_PREFIX + image_hash
+            pipe.sadd(index_key, key)
+            pipe.expire(index_key, IMAGE_KEYS_TTL_SECONDS)
+        pipe.execute()
+
+    async def get_raw_bytes(self, key: str) -> Optional[bytes]:
+        """从缓存获取原始字节（不做反序列化，压缩存储的条目会先解压）"""
+        if not self.enabled:
+            return None
+
+        try:
+            data = self.raw_client.get(key)
+            if data:
+                return decompress_cache_bytes(data) or data
+            return data
+        except Exception as e:
+            logger.error(f"缓存读取失败: {e}")
+            return None
+
+    async def set_raw_bytes(
+        self, key: str, value: bytes, ttl_seconds: int, image_hash: str = None
+    ) -> bool:
+        """设置已序列化的缓存数据（较大的数据压缩后存储）"""
+        if not self.enabled:
+            return False
+
+        try:
+            self._store_entry(
+                key, _frame_raw_bytes, value, ttl_seconds, image_hash=image_hash
+            )
             return True
         except Exception as e:
             logger.error(f"缓存写入失败: {e}")
@@ -104,6 +426,7 @@ class CacheService:
         if not self.enabled:
             return False
 
+        self._local.pop(key)
         try:
             result = self.redis_client.delete(key)
             return result > 0
@@ -111,11 +434,28 @@ class CacheService:
             logger.error(f"缓存删除失败: {e}")
             return False
 
+    async def delete_analysis_result(self, image_hash: str) -> int:
+        """删除某张图像的所有缓存结果（依据写入时登记的缓存键索引）"""
+        if not self.enabled:
+            return 0
+
+        index_key = IMAGE_KEYS_PREFIX + image_hash
+        try:
+            keys = self.redis_client.smembers(index_key)
+            for key in keys:
+                self._local.pop(key)
+            # UNLINK在Redis后台释放内存，不阻塞服务端
+            return self.redis_client.unlink(*keys, index_key)
+        except Exception as e:
+            logger.error(f"清除图像缓存失败: {e}")
+            return 0
+
     async def clear_pattern(self, pattern: str) -> int:
         """根据模式删除缓存"""
         if not self.enabled:
             return 0
 
+        self._local.clear()
         try:
             keys = self.redis_client.keys(pattern)
             if keys:
@@ -131,7 +471,11 @@ class CacheService:
             return {"enabled": False}
 
         try:
-            info = self.redis_client.info()
+            # 服务器信息与持久化的命中/未命中计数在一次往返中读取
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.info()
+            pipe.hgetall(CACHE_STATS_KEY)
+            info, metrics = pipe.execute()
             enhanced_stats = {
                 "enabled": True,
                 "used_memory": info.get("used_memory_human", "Unknown"),
@@ -141,6 +485,7 @@ class CacheService:
                 "keyspace_misses": info.get("keyspace_misses", 0),
                 "cache_stats": self.cache_stats.copy(),
                 "cache_config": self.cache_config.copy(),
+                "metrics": {name: int(count) for name, count in metrics.items()},
             }
 
             # Add hit rate calculation
@@ -163,8 +508,7 @@ class CacheService:
         prefix = config["prefix"]
 
         # Create parameter hash for unique identification
-        param_str = json.dumps(kwargs, sort_keys=True)
-        param_hash = hashlib.md5(param_str.encode()).hexdigest()[:8]
+        param_hash = cache_params_digest(kwargs)
 
         # Include version for cache invalidation
         version = "v1"
@@ -232,7 +576,9 @@ class CacheService:
             )
 
             config = self.cache_config["detection_results"]
-            success = await self.set(cache_key, result, config["ttl_hours"])
+            success = await self.set(
+                cache_key, result, config["ttl_hours"], image_hash=image_hash
+            )
 
             if success:
                 logger.debug(f"Cached detection result: {cache_key}")
@@ -297,7 +643,9 @@ class CacheService:
             )
 
             config = self.cache_config["segmentation_masks"]
-            success = await self.set(cache_key, mask_data, config["ttl_hours"])
+            success = await self.set(
+                cache_key, mask_data, config["ttl_hours"], image_hash=image_hash
+            )
 
             if success:
                 logger.debug(f"Cached segmentation mask: {cache_key}")
@@ -362,7 +710,9 @@ class CacheService:
             )
 
             config = self.cache_config["extraction_results"]
-            success = await self.set(cache_key, result, config["ttl_hours"])
+            success = await self.set(
+                cache_key, result, config["ttl_hours"], image_hash=image_hash
+            )
 
             if success:
                 logger.debug(f"Cached extraction result: {cache_key}")
@@ -420,7 +770,9 @@ class CacheService:
             )
 
             config = self.cache_config["natural_elements"]
-            success = await self.set(cache_key, result, config["ttl_hours"])
+            success = await self.set(
+                cache_key, result, config["ttl_hours"], image_hash=image_hash
+            )
 
             if success:
                 logger.debug(f"Cached natural elements result: {cache_key}")
@@ -545,8 +897,7 @@ class CacheService:
             config = self.cache_config.get(result_type, {"prefix": "unknown"})
             prefix = config["prefix"]
 
-            param_str = json.dumps(kwargs, sort_keys=True)
-            param_hash = hashlib.md5(param_str.encode()).hexdigest()[:8]
+            param_hash = cache_params_digest(kwargs)
 
             cache_key = f"{prefix}:{version}:{image_hash}:{param_hash}"
 
@@ -576,6 +927,93 @@ class CacheService:
             logger.error(f"Failed to cache with version management: {e}")
             return False
 
+    async def get_versioned(
+        self, key: str, version: int, cfg_hash: str
+    ) -> Optional[Any]:
+        """获取带版本元数据的缓存，版本或配置指纹不匹配时视为未命中并清除"""
+        return await self.unwrap_versioned(key, await self.get(key), version, cfg_hash)
+
+    async def unwrap_versioned(
+        self, key: str, entry: Any, version: int, cfg_hash: str
+    ) -> Optional[Any]:
+        """校验已读取的版本化条目（如来自mget），不匹配时清除该键并返回None"""
+        if entry is None:
+            return None
+
+        if (
+            not isinstance(entry, dict)
+            or entry.get("v") != version
+            or entry.get("cfg_hash") != cfg_hash
+        ):
+            await self.delete(key)
+            return None
+
+        return entry.get("body")
+
+    async def set_versioned(
+        self,
+        key: str,
+        body: Any,
+        version: int,
+        cfg_hash: str,
+        ttl_hours: int = None,
+        ttl_seconds: int = None,
+        metric_key: str = None,
+        image_hash: str = None,
+    ) -> bool:
+        """设置带版本元数据的缓存，指定metric_key时同时累加统计计数"""
+        entry = {"v": version, "cfg_hash": cfg_hash, "body": body}
+        if metric_key is None:
+            return await self.set(
+                key, entry, ttl_hours, ttl_seconds=ttl_seconds, image_hash=image_hash
+            )
+
+        if ttl_seconds is None:
+            ttl_seconds = (ttl_hours or settings.CACHE_TTL_HOURS) * 3600
+        return await self.set_with_metric(
+            key, entry, ttl_seconds, metric_key, image_hash=image_hash
+        )
+
+    async def single_flight(
+        self, key: str, compute: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """合并同一键的并发计算：只有第一个调用者执行compute，其余等待其结果
+
+        compute抛出的异常会同样传递给所有等待者。
+        """
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 没有等待者时避免"exception was never retrieved"警告
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    @staticmethod
+    def adaptive_ttl_seconds(processing_time_ms: int) -> int:
+        """根据计算耗时估算TTL：越耗时的结果缓存越久"""
+        ttl_seconds = (
+            processing_time_ms * settings.CACHE_TTL_SECONDS_PER_COMPUTE_SECOND // 1000
+        )
+        return min(
+            settings.CACHE_TTL_MAX_SECONDS,
+            max(settings.CACHE_TTL_MIN_SECONDS, ttl_seconds),
+        )
+
     # LRU Cache Eviction Policies and Optimization
 
     async def implement_lru_eviction(self, max_memory_mb: int = 100) -> Dict[str, Any]:
@@ -899,7 +1337,9 @@ class CacheService:
                     **kwargs,
                 )
                 config = self.cache_config.get("detection_results", {"ttl_hours": 24})
-                success = await self.set(cache_key, result, config["ttl_hours"])
+                success = await self.set(
+                    cache_key, result, config["ttl_hours"], image_hash=image_hash
+                )
 
             if success:
                 logger.debug(f"Cached analysis result: {analysis_type}")
@@ -0,0 +1,107 @@
+import asyncio
+import hashlib
+import logging
+from typing import Optional
+
+from services.cache_service import cache_service
+from services.hash_service import hash_service, near_duplicate_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# 用于计算短指纹的文件头部长度
+DEDUP_HEAD_SIZE = 4096
+
+# Redis位图键及位数（2^24位 = 2MB，足以让误判率保持在较低水平）
+DEDUP_BITMAP_KEY = "img:seen:bits"
+DEDUP_BITMAP_BITS = 1 << 24
+
+# 感知哈希 -> 首个同感知哈希图像的指针，分析结果仍只按真实内容哈希缓存
+NEAR_DUPLICATE_KEY_PREFIX = "phash_ptr:"
+NEAR_DUPLICATE_TTL_SECONDS = 7 * 24 * 3600
+
+# 细粒度指纹（256位）允许的最大汉明距离，超过则视为不同图像
+NEAR_DUPLICATE_MAX_DISTANCE = 8
+
+
+class DedupFilter:
+    """基于Redis位图的重复上传预过滤器（布隆过滤器风格）
+
+    位为0时图像一定未上传过，可跳过完整的重复检查；
+    位为1时图像可能已存在，需要按MD5进一步确认。
+    """
+
+    @staticmethod
+    def fingerprint(head: bytes) -> int:
+        """根据文件头部计算位图偏移（SHA-256截断为32位）"""
+        sha32 = int.from_bytes(hashlib.sha256(head).digest()[:4], "big")
+        return sha32 % DEDUP_BITMAP_BITS
+
+    async def maybe_known(self, offset: int) -> bool:
+        """判断图像是否可能已上传过；缓存不可用时保守地返回True"""
+        if not cache_service.is_enabled():
+            return True
+
+        try:
+            return bool(cache_service.raw_client.getbit(DEDUP_BITMAP_KEY, offset))
+        except Exception as e:
+            logger.error(f"查询去重位图失败: {e}")
+            return True
+
+    async def mark_known(self, offset: int) -> None:
+        """将图像标记为已上传"""
+        if not cache_service.is_enabled():
+            return
+
+        try:
+            cache_service.raw_client.setbit(DEDUP_BITMAP_KEY, offset, 1)
+        except Exception as e:
+            logger.error(f"更新去重位图失败: {e}")
+
+
+class NearDuplicateIndex:
+    """视觉上相同但字节不同的图像（重新压缩、EXIF不同）之间的结果复用
+
+    每个感知哈希记录第一张分析过的图像及其细粒度指纹。指针登记在该图像的
+    缓存键索引中，图像删除时随之失效；64位感知哈希相同时还需细粒度指纹
+    足够接近才会复用，避免不同图像因哈希碰撞拿到彼此的结果。
+    """
+
+    async def resolve(
+        self, image_hash: str, perceptual_hash: Optional[str], image_content: bytes
+    ) -> Optional[str]:
+        """返回可复用其缓存结果的近似重复图像哈希；没有指针时将当前图像登记为指针"""
+        if not perceptual_hash or not cache_service.is_enabled():
+            return None
+
+        key = NEAR_DUPLICATE_KEY_PREFIX + perceptual_hash
+        pointer = await cache_service.get(key)
+        if pointer and pointer.get("image_hash") == image_hash:
+            return None
+
+        # 解码图像计算指纹，放到线程池中执行
+        loop = asyncio.get_running_loop()
+        fingerprint = await loop.run_in_executor(
+            None, near_duplicate_fingerprint, image_content
+        )
+        if not fingerprint:
+            return None
+
+        if not pointer:
+            await cache_service.set(
+                key,
+                {"image_hash": image_hash, "fingerprint": fingerprint},
+                ttl_seconds=NEAR_DUPLICATE_TTL_SECONDS,
+                image_hash=image_hash,
+            )
+            return None
+
+        if hash_service.is_similar_image(
+            fingerprint, pointer.get("fingerprint"), NEAR_DUPLICATE_MAX_DISTANCE
+        ):
+            return pointer["image_hash"]
+        return None
+
+
+# 创建全局实例
+dedup_filter = DedupFilter()
+near_duplicate_index = NearDuplicateIndex()
@@ -1,14 +1,18 @@
+import asyncio
+import functools
 import io
 import logging
 import os
+import tempfile
 import uuid
 from datetime import datetime
-from typing import Optional, Tuple
+from typing import BinaryIO, Optional, Tuple
 
 from google.auth.exceptions import DefaultCredentialsError
 from google.cloud import storage
 from google.cloud.exceptions import GoogleCloudError
 from PIL import Image
+from requests.adapters import HTTPAdapter
 
 from app.core.error_monitoring import (
     ErrorRecovery,
@@ -27,6 +31,17 @@ from services.hash_service import hash_service
 
 logger = logging.getLogger(__name__)
 
+# 可恢复上传的分块大小（必须是256KB的整数倍）
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+# 超过该大小的对象按字节范围分块并发下载，较小的对象一次性下载开销更低
+PARALLEL_DOWNLOAD_THRESHOLD = 16 * 1024 * 1024
+PARALLEL_DOWNLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+PARALLEL_DOWNLOAD_WORKERS = 4
+
+# HTTP连接池大小：GCS调用在线程池中并发执行，requests默认的10个连接会被反复丢弃重建
+GCS_HTTP_POOL_SIZE = 64
+
 
 class GCSService:
     """Google Cloud Storage 服务"""
@@ -40,6 +55,11 @@ class GCSService:
         try:
             # 尝试初始化Google Cloud Storage客户端
             self.client = storage.Client(project=settings.GOOGLE_CLOUD_PROJECT_ID)
+            # 所有请求共享同一个会话，扩大连接池以复用已建立的TLS连接
+            adapter = HTTPAdapter(
+                pool_connections=GCS_HTTP_POOL_SIZE, pool_maxsize=GCS_HTTP_POOL_SIZE
+            )
+            self.client._http.mount("https://", adapter)
             self.enabled = True
             logger.info("Google Cloud Storage客户端初始化成功")
         except DefaultCredentialsError as e:
@@ -73,6 +93,14 @@ class GCSService:
 
     def validate_image(self, file_content: bytes, filename: str) -> Tuple[bool, str]:
         """验证图像文件"""
+        return self.validate_image_file(
+            io.BytesIO(file_content), filename, len(file_content)
+        )
+
+    def validate_image_file(
+        self, image_file: BinaryIO, filename: str, file_size: int
+    ) -> Tuple[bool, str]:
+        """验证图像文件对象（不读入整块内存），完成后将文件指针复位"""
         try:
             # 检查文件扩展名
             file_ext = os.path.splitext(filename)[1].lower()
@@ -80,7 +108,7 @@ class GCSService:
                 return False, f"不支持的文件格式: {file_ext}"
 
             # 检查文件大小
-            if len(file_content) > settings.MAX_UPLOAD_SIZE:
+            if file_size > settings.MAX_UPLOAD_SIZE:
                 return (
                     False,
                     f"文件太大，最大支持 {settings.MAX_UPLOAD_SIZE / 1024 / 1024}MB",
@@ -88,17 +116,23 @@ class GCSService:
 
             # 验证图像格式
             try:
-                image = Image.open(io.BytesIO(file_content))
+                image = Image.open(image_file)
                 image.verify()  # 验证图像完整性
                 return True, "验证通过"
             except Exception as e:
                 return False, f"图像格式无效: {str(e)}"
+            finally:
+                image_file.seek(0)
 
         except Exception as e:
             return False, f"验证失败: {str(e)}"
 
     async def upload_image(
-        self, file_content: bytes, filename: str, content_type: str
+        self,
+        file_content: bytes,
+        filename: str,
+        content_type: str,
+        folder_prefix: str = "images/",
     ) -> Tuple[str, str, str, Optional[str]]:
         """
         上传图像到GCS
@@ -109,40 +143,88 @@ class GCSService:
                 "Google Cloud Storage", "GCS service is not enabled"
             )
 
-        try:
-            # 计算图像哈希
-            md5_hash, perceptual_hash = hash_service.calculate_combined_hash(
-                file_content
+        # 计算图像哈希
+        md5_hash, perceptual_hash = hash_service.calculate_combined_hash(file_content)
+
+        return await self.upload_image_file(
+            io.BytesIO(file_content),
+            filename,
+            content_type,
+            md5_hash=md5_hash,
+            file_size=len(file_content),
+            perceptual_hash=perceptual_hash,
+            folder_prefix=folder_prefix,
+        )
+
+    async def upload_image_file(
+        self,
+        image_file: BinaryIO,
+        filename: str,
+        content_type: str,
+        md5_hash: str,
+        file_size: int,
+        perceptual_hash: Optional[str] = None,
+        folder_prefix: str = "images/",
+    ) -> Tuple[str, str, str, Optional[str]]:
+        """
+        以流的方式上传图像到GCS（哈希已由调用方在读取时计算）
+        返回: (image_id, image_hash, gcs_url, perceptual_hash)
+        """
+        if not self.enabled:
+            raise ServiceUnavailableError(
+                "Google Cloud Storage", "GCS service is not enabled"
             )
 
-            # 使用哈希值作为文件名，保证相同图像只存储一次
+        # GCS客户端是同步的，放到线程池中执行，避免阻塞事件循环
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            functools.partial(
+                self._upload_image_file_sync,
+                image_file,
+                filename,
+                content_type,
+                md5_hash,
+                file_size,
+                perceptual_hash,
+                folder_prefix,
+            ),
+        )
+
+    def _upload_image_file_sync(
+        self,
+        image_file: BinaryIO,
+        filename: str,
+        content_type: str,
+        md5_hash: str,
+        file_size: int,
+        perceptual_hash: Optional[str],
+        folder_prefix: str,
+    ) -> Tuple[str, str, str, Optional[str]]:
+        try:
             file_ext = os.path.splitext(filename)[1].lower()
-            blob_name = f"images/{md5_hash}{file_ext}"
+            blob_name = f"{folder_prefix}{md5_hash}{file_ext}"
 
-            # 检查文件是否已存在
-            blob = self.bucket.blob(blob_name)
+            # 检查文件是否已存在；较大的文件按块进行可恢复上传
+            blob = self.bucket.blob(blob_name, chunk_size=UPLOAD_CHUNK_SIZE)
             if blob.exists():
                 logger.info(f"📋 图像已存在，返回现有链接: {md5_hash[:8]}...")
                 return md5_hash, md5_hash, blob.public_url, perceptual_hash
 
-            # 上传新文件
-            blob.upload_from_string(file_content, content_type=content_type)
-
-            # 设置元数据
+            # 元数据随上传请求一起提交，无需再单独patch
             metadata = {
                 "original_filename": filename,
                 "upload_time": datetime.now().isoformat(),
                 "md5_hash": md5_hash,
-                "file_size": str(len(file_content)),
+                "file_size": str(file_size),
             }
             if perceptual_hash:
                 metadata["perceptual_hash"] = perceptual_hash
-
             blob.metadata = metadata
-            blob.patch()
 
-            # 设置公开访问权限（如果需要）
-            # blob.make_public()
+            blob.upload_from_file(
+                image_file, rewind=True, size=file_size, content_type=content_type
+            )
 
             logger.info(f"✅ 图像上传成功: {md5_hash[:8]}... -> {blob_name}")
             return md5_hash, md5_hash, blob.public_url, perceptual_hash
@@ -186,24 +268,32 @@ class GCSService:
     async def download_image(
         self, image_hash: str, file_extension: str = None
     ) -> Optional[bytes]:
-        """通过哈希值下载图像内容"""
+        """通过哈希值下载图像内容，图像不存在时返回None"""
         if not self.enabled:
             logger.warning("GCS服务未启用，无法下载图像")
             return None
 
+        # GCS客户端是同步的，放到线程池中执行，避免阻塞事件循环
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, self._download_image_sync, image_hash, file_extension
+        )
+
+    def _download_image_sync(
+        self, image_hash: str, file_extension: Optional[str]
+    ) -> Optional[bytes]:
         try:
             if file_extension:
-                blob_name = f"images/{image_hash}{file_extension}"
-                blob = self.bucket.blob(blob_name)
-                if blob.exists():
-                    return blob.download_as_bytes()
+                # get_blob同时完成存在性检查和元数据（大小）读取
+                blob = self.bucket.get_blob(f"images/{image_hash}{file_extension}")
+                if blob is not None:
+                    return self._download_blob_bytes(blob)
             else:
                 # 尝试常见的图像格式
                 for ext in [".jpg", ".jpeg", ".png", ".webp", ".gif"]:
-                    blob_name = f"images/{image_hash}{ext}"
-                    blob = self.bucket.blob(blob_name)
-                    if blob.exists():
-                        return blob.download_as_bytes()
+                    blob = self.bucket.get_blob(f"images/{image_hash}{ext}")
+                    if blob is not None:
+                        return self._download_blob_bytes(blob)
 
             return None
 
@@ -211,6 +301,25 @@ class GCSService:
             logger.error(f"下载图像失败: {e}")
             return None
 
+    def _download_blob_bytes(self, blob) -> bytes:
+        """下载对象内容；大对象使用transfer_manager分块并发下载"""
+        if not blob.size or blob.size <= PARALLEL_DOWNLOAD_THRESHOLD:
+            return blob.download_as_bytes()
+
+        # 预览功能，仅在需要时导入
+        from google.cloud.storage import transfer_manager
+
+        with tempfile.NamedTemporaryFile() as tmp:
+            transfer_manager.download_chunks_concurrently(
+                blob,
+                tmp.name,
+                chunk_size=PARALLEL_DOWNLOAD_CHUNK_SIZE,
+                worker_type=transfer_manager.THREAD,
+                max_workers=PARALLEL_DOWNLOAD_WORKERS,
+            )
+            tmp.seek(0)
+            return tmp.read()
+
     async def delete_image(self, image_hash: str, file_extension: str = None) -> bool:
         """通过哈希值删除图像"""
         if not self.enabled:
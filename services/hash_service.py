@@ -1,30 +1,107 @@
 import hashlib
 import io
-from typing import Optional, Tuple
+from typing import BinaryIO, Optional, Tuple
 
-import imagehash
+import numpy as np
 from PIL import Image
 
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+from config import settings
+
+# 平均哈希边长（8x8 = 64位）
+AVERAGE_HASH_SIZE = 8
+
+# 近似重复确认指纹的边长（16x16 = 256位）
+NEAR_DUPLICATE_HASH_SIZE = 16
+
+# JPEG解码时的目标尺寸：利用DCT缩放直接以低分辨率解码，远大于哈希尺寸以保持精度
+_HASH_DRAFT_SIZE = (256, 256)
+
+
+def average_hash_hex(image: Image.Image, hash_size: int = AVERAGE_HASH_SIZE) -> str:
+    """计算平均哈希并返回十六进制字符串（与imagehash.average_hash的str结果一致）"""
+    image.draft("L", _HASH_DRAFT_SIZE)
+    small = image.convert("L").resize((hash_size, hash_size), Image.Resampling.LANCZOS)
+    pixels = np.asarray(small)
+    # 不超过256个uint8之和在float32中可精确表示，均值与float64计算结果相同
+    bits = pixels > pixels.mean(dtype=np.float32)
+    return np.packbits(bits).tobytes().hex()
+
+
+def near_duplicate_fingerprint(image_content: bytes) -> Optional[str]:
+    """计算用于确认近似重复的细粒度指纹（16x16平均哈希，256位）
+
+    64位感知哈希相同的两张图像仍可能完全不同，复用分析结果前用该指纹再次确认。
+    """
+    try:
+        return average_hash_hex(
+            Image.open(io.BytesIO(image_content)), NEAR_DUPLICATE_HASH_SIZE
+        )
+    except Exception:
+        return None
+
+
+# 内容哈希的摘要长度（16字节 = 32位十六进制，与MD5一致）
+CONTENT_HASH_DIGEST_SIZE = 16
+
+
+class _Blake3Hasher:
+    """blake3哈希对象的适配：hexdigest输出与其他算法相同的长度"""
+
+    def __init__(self):
+        self._hasher = blake3.blake3(max_threads=blake3.blake3.AUTO)
+
+    def update(self, data: bytes) -> None:
+        self._hasher.update(data)
+
+    def hexdigest(self) -> str:
+        return self._hasher.hexdigest(length=CONTENT_HASH_DIGEST_SIZE)
+
+
+def new_content_hasher():
+    """按配置创建图像内容哈希对象（支持增量update，hexdigest为32位十六进制）"""
+    algorithm = settings.CONTENT_HASH_ALGORITHM
+    if algorithm == "blake3" and blake3 is not None:
+        return _Blake3Hasher()
+    if algorithm in ("blake2b", "blake3"):
+        # 未安装blake3时退回标准库的blake2b
+        return hashlib.blake2b(digest_size=CONTENT_HASH_DIGEST_SIZE)
+    return hashlib.md5()
+
 
 class ImageHashService:
     """图像哈希处理服务"""
 
     @staticmethod
     def calculate_md5_hash(image_content: bytes) -> str:
-        """计算图像内容的MD5哈希值"""
-        return hashlib.md5(image_content).hexdigest()
+        """计算图像内容哈希值（默认MD5，算法由CONTENT_HASH_ALGORITHM配置）"""
+        hasher = new_content_hasher()
+        hasher.update(image_content)
+        return hasher.hexdigest()
 
     @staticmethod
     def calculate_perceptual_hash(image_content: bytes) -> str:
         """计算图像的感知哈希值（用于检测相似图像）"""
+        return ImageHashService.calculate_perceptual_hash_from_file(
+            io.BytesIO(image_content)
+        )
+
+    @staticmethod
+    def calculate_perceptual_hash_from_file(image_file: BinaryIO) -> Optional[str]:
+        """从文件对象计算感知哈希值，完成后将文件指针复位"""
         try:
-            image = Image.open(io.BytesIO(image_content))
+            image = Image.open(image_file)
             # 使用平均哈希算法
-            phash = imagehash.average_hash(image)
-            return str(phash)
+            return average_hash_hex(image)
         except Exception as e:
             print(f"计算感知哈希失败: {e}")
             return None
+        finally:
+            image_file.seek(0)
 
     @staticmethod
     def calculate_combined_hash(image_content: bytes) -> Tuple[str, Optional[str]]:
@@ -33,6 +110,16 @@ class ImageHashService:
         perceptual_hash = ImageHashService.calculate_perceptual_hash(image_content)
         return md5_hash, perceptual_hash
 
+    @staticmethod
+    def calculate_combined_hash_streaming(
+        md5_obj: "hashlib._Hash", image_file: BinaryIO
+    ) -> Tuple[str, Optional[str]]:
+        """组合哈希的流式版本：MD5已在读取时增量计算，感知哈希从文件对象解码"""
+        perceptual_hash = ImageHashService.calculate_perceptual_hash_from_file(
+            image_file
+        )
+        return md5_obj.hexdigest(), perceptual_hash
+
     @staticmethod
     def hamming_distance(hash1: str, hash2: str) -> int:
         """计算两个哈希值的汉明距离（用于相似度检测）"""
@@ -50,35 +50,16 @@ class ImageAnnotationService:
         Render complete annotated image with all detection results
         """
         try:
-            # Load image
-            pil_image = Image.open(io.BytesIO(image_content))
-            if pil_image.mode != "RGB":
-                pil_image = pil_image.convert("RGB")
-
-            # Apply custom styles if provided
-            styles = self.default_styles.copy()
-            if custom_styles:
-                styles.update(custom_styles)
-
-            # Create drawing context
-            draw = ImageDraw.Draw(pil_image)
-            img_width, img_height = pil_image.size
-
-            # Render object bounding boxes
-            if include_object_boxes and objects:
-                self._render_bounding_boxes(
-                    draw, objects, img_width, img_height, styles
-                )
-
-            # Render face markers
-            if include_face_markers and faces:
-                self._render_face_markers(draw, faces, img_width, img_height, styles)
-
-            # Render labels with connections
-            if include_labels and (objects or labels):
-                self._render_labels_with_connections(
-                    draw, objects or [], labels or [], img_width, img_height, styles
-                )
+            pil_image = self._draw_annotations(
+                image_content,
+                objects,
+                faces,
+                labels,
+                include_face_markers,
+                include_object_boxes,
+                include_labels,
+                custom_styles,
+            )
 
             # Convert back to bytes
             output_buffer = io.BytesIO()
@@ -89,6 +70,78 @@ class ImageAnnotationService:
             logger.error(f"Image annotation rendering failed: {e}")
             return image_content  # Return original image on error
 
+    def render_annotated_image_pil(
+        self,
+        image_content: bytes,
+        objects: List[EnhancedDetectionResult] = None,
+        faces: List[FaceDetectionResult] = None,
+        labels: List[Dict[str, Any]] = None,
+        include_face_markers: bool = True,
+        include_object_boxes: bool = True,
+        include_labels: bool = True,
+        custom_styles: Optional[Dict[str, Any]] = None,
+    ) -> Image.Image:
+        """
+        Render annotations and return the PIL image, leaving encoding to the caller
+        """
+        try:
+            return self._draw_annotations(
+                image_content,
+                objects,
+                faces,
+                labels,
+                include_face_markers,
+                include_object_boxes,
+                include_labels,
+                custom_styles,
+            )
+
+        except Exception as e:
+            logger.error(f"Image annotation rendering failed: {e}")
+            return Image.open(io.BytesIO(image_content))  # Original image on error
+
+    def _draw_annotations(
+        self,
+        image_content: bytes,
+        objects: Optional[List[EnhancedDetectionResult]],
+        faces: Optional[List[FaceDetectionResult]],
+        labels: Optional[List[Dict[str, Any]]],
+        include_face_markers: bool,
+        include_object_boxes: bool,
+        include_labels: bool,
+        custom_styles: Optional[Dict[str, Any]],
+    ) -> Image.Image:
+        """Decode the image once and draw all requested annotations onto it"""
+        # Load image
+        pil_image = Image.open(io.BytesIO(image_content))
+        if pil_image.mode != "RGB":
+            pil_image = pil_image.convert("RGB")
+
+        # Apply custom styles if provided
+        styles = self.default_styles.copy()
+        if custom_styles:
+            styles.update(custom_styles)
+
+        # Create drawing context
+        draw = ImageDraw.Draw(pil_image)
+        img_width, img_height = pil_image.size
+
+        # Render object bounding boxes
+        if include_object_boxes and objects:
+            self._render_bounding_boxes(draw, objects, img_width, img_height, styles)
+
+        # Render face markers
+        if include_face_markers and faces:
+            self._render_face_markers(draw, faces, img_width, img_height, styles)
+
+        # Render labels with connections
+        if include_labels and (objects or labels):
+            self._render_labels_with_connections(
+                draw, objects or [], labels or [], img_width, img_height, styles
+            )
+
+        return pil_image
+
     def _render_bounding_boxes(
         self,
         draw: ImageDraw.Draw,
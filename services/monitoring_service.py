@@ -408,7 +408,7 @@ class MonitoringService:
                 }
 
             # Test read
-            read_value = await self.cache_service.get(test_key)
+            read_value = await self.cache_service.get(test_key, use_local=False)
             if read_value != test_value:
                 return {
                     "status": "unhealthy",
@@ -1,9 +1,11 @@
+import hashlib
 import io
 import logging
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
+import orjson
 from google.cloud import vision
 from google.cloud.exceptions import GoogleCloudError
 from PIL import Image
@@ -18,6 +20,9 @@ from models.image import (
 
 logger = logging.getLogger(__name__)
 
+# 缓存的分析结果结构版本，NaturalElementsResult或缓存条目格式变化时递增
+CACHE_SCHEMA_VERSION = 2
+
 
 class NaturalElementAnalyzer:
     """
@@ -153,11 +158,27 @@ class NaturalElementAnalyzer:
             "poor": ["brown", "dry", "sparse", "wilted", "dead", "bare"],
         }
 
+        # 分析配置指纹，配置变化后旧的缓存结果自动失效
+        self.config_hash = hashlib.blake2b(
+            orjson.dumps(
+                {
+                    "categories": self.natural_element_categories,
+                    "seasonal": self.seasonal_indicators,
+                    "health": self.health_indicators,
+                },
+                option=orjson.OPT_SORT_KEYS,
+            ),
+            digest_size=8,
+        ).hexdigest()
+
     async def analyze_natural_elements(
         self,
         image_content: bytes,
         vision_client: vision.ImageAnnotatorClient,
         analysis_depth: str = "comprehensive",
+        include_health: bool = True,
+        include_seasonal: bool = True,
+        include_color: bool = True,
     ) -> NaturalElementsResult:
         """
         Analyze natural elements in park images using Google Vision labels
@@ -166,6 +187,9 @@ class NaturalElementAnalyzer:
             image_content: Raw image bytes
             vision_client: Google Vision API client
             analysis_depth: "basic" or "comprehensive"
+            include_health: Compute vegetation health metrics
+            include_seasonal: Compute seasonal analysis (comprehensive depth only)
+            include_color: Compute dominant colors and color diversity
 
         Returns:
             NaturalElementsResult with coverage statistics and health assessment
@@ -197,13 +221,18 @@ class NaturalElementAnalyzer:
             # Calculate coverage percentages
             coverage_stats = self._calculate_coverage_percentages(categorized_elements)
 
-            # Analyze image colors for vegetation health
-            color_analysis = self._analyze_image_colors(image_content)
+            # Sections that were not requested are never computed
+            assess_health = include_health and bool(categorized_elements.get("vegetation"))
+
+            # Analyze image colors (also feeds the vegetation health metrics)
+            color_analysis = None
+            if include_color or assess_health:
+                color_analysis = self._analyze_image_colors(image_content)
 
             # Calculate vegetation health metrics
             vegetation_health_metrics = None
             vegetation_health_score = None
-            if categorized_elements.get("vegetation"):
+            if assess_health:
                 vegetation_health_metrics = self._calculate_detailed_vegetation_health(
                     categorized_elements, color_analysis, labels
                 )
@@ -212,15 +241,18 @@ class NaturalElementAnalyzer:
             # Detect seasonal indicators and create seasonal analysis
             seasonal_indicators = []
             seasonal_analysis = None
-            if analysis_depth == "comprehensive":
+            if include_seasonal and analysis_depth == "comprehensive":
                 seasonal_analysis = self._create_seasonal_analysis(labels)
                 seasonal_indicators = seasonal_analysis.detected_seasons
 
-            # Extract dominant colors with enhanced information
-            dominant_colors = self._extract_enhanced_dominant_colors(color_analysis)
+            dominant_colors = []
+            color_diversity_score = None
+            if include_color:
+                # Extract dominant colors with enhanced information
+                dominant_colors = self._extract_enhanced_dominant_colors(color_analysis)
 
-            # Calculate color diversity score
-            color_diversity_score = self._calculate_color_diversity(color_analysis)
+                # Calculate color diversity score
+                color_diversity_score = self._calculate_color_diversity(color_analysis)
 
             # Create detailed element categories
             element_categories = self._create_element_categories(categorized_elements)
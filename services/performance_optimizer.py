@@ -23,6 +23,7 @@ except ImportError:
 import os
 
 from services.cache_service import CacheService
+from services.dedup_filter import near_duplicate_index
 from services.enhanced_vision_service import enhanced_vision_service
 from services.error_handling import (
     ProcessingException,
@@ -558,8 +559,13 @@ class PerformanceOptimizer:
         include_faces: bool = True,
         include_labels: bool = True,
         use_batching: bool = True,
+        perceptual_hash: Optional[str] = None,
     ) -> Dict[str, Any]:
-        """Optimized object detection with caching and batching"""
+        """Optimized object detection with caching and batching
+
+        With perceptual_hash, a miss falls back to the cached result of a
+        verified near-duplicate upload before calling the Vision API.
+        """
         start_time = time.time()
 
         try:
@@ -570,6 +576,17 @@ class PerformanceOptimizer:
                 include_faces=include_faces,
                 include_labels=include_labels,
             )
+            if not cached_result:
+                source_hash = await near_duplicate_index.resolve(
+                    image_hash, perceptual_hash, image_content
+                )
+                if source_hash:
+                    cached_result = await self.cache_service.get_detection_result(
+                        image_hash=source_hash,
+                        confidence_threshold=confidence_threshold,
+                        include_faces=include_faces,
+                        include_labels=include_labels,
+                    )
 
             if cached_result:
                 with self._lock:
@@ -635,8 +652,13 @@ class PerformanceOptimizer:
         image_hash: str,
         analysis_depth: str = "comprehensive",
         use_batching: bool = True,
+        perceptual_hash: Optional[str] = None,
     ) -> Dict[str, Any]:
-        """Optimized natural elements analysis"""
+        """Optimized natural elements analysis
+
+        With perceptual_hash, a miss falls back to the cached result of a
+        verified near-duplicate upload before calling the Vision API.
+        """
         start_time = time.time()
 
         try:
@@ -644,6 +666,14 @@ class PerformanceOptimizer:
             cached_result = await self.cache_service.get_natural_elements_result(
                 image_hash=image_hash, analysis_depth=analysis_depth
             )
+            if not cached_result:
+                source_hash = await near_duplicate_index.resolve(
+                    image_hash, perceptual_hash, image_content
+                )
+                if source_hash:
+                    cached_result = await self.cache_service.get_natural_elements_result(
+                        image_hash=source_hash, analysis_depth=analysis_depth
+                    )
 
             if cached_result:
                 with self._lock:
@@ -1,12 +1,17 @@
 import json
 import os
+from collections import OrderedDict
 from datetime import datetime
+from itertools import islice
 from typing import Any, Dict, List, Optional, Tuple
 
 from config import settings
 from models.image import DuplicateCheckResponse, ImageInfo
 from services.hash_service import hash_service
 
+# 按哈希缓存的ImageInfo数量上限
+IMAGE_INFO_CACHE_SIZE = 4096
+
 
 class StorageService:
     """图像元数据存储服务"""
@@ -16,6 +21,8 @@ class StorageService:
         self.hash_index_file = "hash_index.json"
         self.data = self._load_data()
         self.hash_index = self._load_hash_index()
+        # 按哈希缓存已构建的ImageInfo（LRU），写入或删除时失效
+        self._info_cache: "OrderedDict[str, ImageInfo]" = OrderedDict()
 
     def _load_data(self) -> Dict[str, Dict[str, Any]]:
         """加载存储的数据"""
@@ -134,6 +141,7 @@ class StorageService:
                 "upload_time": image_info.upload_time.isoformat(),
             }
 
+            self._invalidate_image_info(image_info.image_hash)
             self._save_data()
             self._save_hash_index()
             return True
@@ -159,8 +167,26 @@ class StorageService:
             )
         return None
 
+    def _invalidate_image_info(self, image_hash: Optional[str]):
+        """清除某个哈希的ImageInfo缓存"""
+        if image_hash:
+            self._info_cache.pop(image_hash, None)
+
     async def get_image_info_by_hash(self, image_hash: str) -> Optional[ImageInfo]:
-        """根据图像哈希获取图像信息"""
+        """根据图像哈希获取图像信息（结果在进程内缓存，调用方不应修改返回对象）"""
+        image_info = self._info_cache.get(image_hash)
+        if image_info is not None:
+            self._info_cache.move_to_end(image_hash)
+            return image_info
+
+        image_info = await self._find_image_info_by_hash(image_hash)
+        if image_info is not None:
+            self._info_cache[image_hash] = image_info
+            if len(self._info_cache) > IMAGE_INFO_CACHE_SIZE:
+                self._info_cache.popitem(last=False)
+        return image_info
+
+    async def _find_image_info_by_hash(self, image_hash: str) -> Optional[ImageInfo]:
         # 首先检查哈希索引
         if image_hash in self.hash_index:
             image_id = self.hash_index[image_hash]["image_id"]
@@ -196,6 +222,7 @@ class StorageService:
             if image_info.image_id in self.data:
                 self.data[image_info.image_id]["analysis_results"] = analysis_results
                 self.data[image_info.image_id]["processed"] = True
+                self._invalidate_image_info(image_hash)
                 self._save_data()
                 return True
             return False
@@ -212,6 +239,7 @@ class StorageService:
 
                 # 删除主数据
                 del self.data[image_id]
+                self._invalidate_image_info(image_hash)
 
                 # 删除哈希索引
                 if image_hash and image_hash in self.hash_index:
@@ -235,7 +263,8 @@ class StorageService:
     async def list_images(self, limit: int = 100, offset: int = 0) -> List[ImageInfo]:
         """列出图像信息"""
         try:
-            items = list(self.data.items())[offset : offset + limit]
+            # 数据按插入（上传）顺序保存，直接切片迭代，无需复制全部条目
+            items = islice(self.data.items(), offset, offset + limit)
             images = []
             for image_id, data in items:
                 images.append(
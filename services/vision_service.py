@@ -1,8 +1,10 @@
+import asyncio
 import base64
 import io
 import logging
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 from google.auth.exceptions import DefaultCredentialsError
 from google.cloud import vision
@@ -12,6 +14,11 @@ from config import settings
 
 logger = logging.getLogger(__name__)
 
+# batch_annotate_images 单次最多支持16张图像
+VISION_BATCH_MAX_SIZE = 16
+# 合批等待窗口（秒）
+VISION_BATCH_WINDOW_SECONDS = 0.01
+
 
 class VisionService:
     """Google Cloud Vision 分析服务"""
@@ -20,6 +27,11 @@ class VisionService:
         self.client = None
         self.enabled = False
 
+        # 待合批的请求: (图像内容, 分析类型, 结果Future)
+        self._pending: List[Tuple[bytes, str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._inflight_batches: Set[asyncio.Task] = set()
+
         try:
             # 尝试初始化Google Cloud Vision客户端
             self.client = vision.ImageAnnotatorClient()
@@ -42,6 +54,8 @@ class VisionService:
         """
         分析图像内容
         analysis_type: comprehensive, objects, text, landmarks, faces
+
+        并发请求会在短时间窗口内合并为一次 batch_annotate_images 调用
         """
         if not self.enabled:
             logger.warning("Vision服务未启用，返回模拟结果")
@@ -56,35 +70,10 @@ class VisionService:
             }
 
         try:
-            image = vision.Image(content=image_content)
             results = {"enabled": True}
 
-            if analysis_type == "comprehensive" or analysis_type == "all":
-                # 综合分析
-                results.update(await self._detect_objects(image))
-                results.update(await self._detect_text(image))
-                results.update(await self._detect_landmarks(image))
-                results.update(await self._detect_labels(image))
-                results.update(await self._detect_faces(image))
-                results.update(await self._analyze_safe_search(image))
-
-            elif analysis_type == "objects":
-                results.update(await self._detect_objects(image))
-
-            elif analysis_type == "text":
-                results.update(await self._detect_text(image))
-
-            elif analysis_type == "landmarks":
-                results.update(await self._detect_landmarks(image))
-
-            elif analysis_type == "labels":
-                results.update(await self._detect_labels(image))
-
-            elif analysis_type == "faces":
-                results.update(await self._detect_faces(image))
-
-            elif analysis_type == "safety":
-                results.update(await self._analyze_safe_search(image))
+            if self._features_for(analysis_type):
+                results.update(await self._submit_to_batch(image_content, analysis_type))
 
             results["analysis_time"] = datetime.now().isoformat()
             results["analysis_type"] = analysis_type
@@ -96,160 +85,233 @@ class VisionService:
         except Exception as e:
             raise Exception(f"图像分析失败: {str(e)}")
 
-    async def _detect_objects(self, image: vision.Image) -> Dict[str, Any]:
-        """检测图像中的对象"""
-        try:
-            response = self.client.object_localization(image=image)
-            objects = []
+    # 请求合批
 
-            for obj in response.localized_object_annotations:
-                vertices = []
-                for vertex in obj.bounding_poly.normalized_vertices:
-                    vertices.append({"x": vertex.x, "y": vertex.y})
+    @staticmethod
+    def _features_for(analysis_type: str) -> List[str]:
+        """获取分析类型对应的Vision特性列表"""
+        if analysis_type in ("comprehensive", "all"):
+            return list(_PARSERS)
+        if analysis_type in _ANALYSIS_FEATURES:
+            return [_ANALYSIS_FEATURES[analysis_type]]
+        return []
 
-                objects.append(
-                    {
-                        "name": obj.name,
-                        "confidence": obj.score,
-                        "bounding_box": vertices,
-                    }
-                )
-
-            return {"objects": objects}
-
-        except Exception as e:
-            print(f"对象检测失败: {e}")
-            return {"objects": []}
+    async def _submit_to_batch(
+        self, image_content: bytes, analysis_type: str
+    ) -> Dict[str, Any]:
+        """提交请求到合批队列并等待结果"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((image_content, analysis_type, future))
+
+        if len(self._pending) >= VISION_BATCH_MAX_SIZE:
+            self._flush_pending()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(
+                VISION_BATCH_WINDOW_SECONDS, self._flush_pending
+            )
+
+        return await future
+
+    def _flush_pending(self):
+        """取出当前队列中的请求并发起一次批量调用"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._dispatch_batch(batch))
+            self._inflight_batches.add(task)
+            task.add_done_callback(self._inflight_batches.discard)
+
+    async def _dispatch_batch(
+        self, batch: List[Tuple[bytes, str, asyncio.Future]]
+    ) -> None:
+        """执行批量调用并将结果分发给等待中的请求"""
+        requests = [
+            vision.AnnotateImageRequest(
+                image=vision.Image(content=image_content),
+                features=[
+                    vision.Feature(type_=getattr(vision.Feature.Type, feature))
+                    for feature in self._features_for(analysis_type)
+                ],
+            )
+            for image_content, analysis_type, _ in batch
+        ]
 
-    async def _detect_text(self, image: vision.Image) -> Dict[str, Any]:
-        """检测图像中的文本"""
         try:
-            response = self.client.text_detection(image=image)
-            texts = []
-
-            if response.text_annotations:
-                # 第一个结果是完整文本
-                full_text = response.text_annotations[0].description
-
-                # 其余是单个文字/词语
-                for text in response.text_annotations[1:]:
-                    vertices = []
-                    for vertex in text.bounding_poly.vertices:
-                        vertices.append({"x": vertex.x, "y": vertex.y})
-
-                    texts.append({"text": text.description, "bounding_box": vertices})
-
-                return {
-                    "text_detection": {
-                        "full_text": full_text,
-                        "individual_texts": texts,
-                    }
-                }
-
-            return {"text_detection": {"full_text": "", "individual_texts": []}}
-
+            loop = asyncio.get_running_loop()
+            batch_response = await loop.run_in_executor(
+                None, partial(self.client.batch_annotate_images, requests=requests)
+            )
         except Exception as e:
-            print(f"文本检测失败: {e}")
-            return {"text_detection": {"full_text": "", "individual_texts": []}}
-
-    async def _detect_landmarks(self, image: vision.Image) -> Dict[str, Any]:
-        """检测图像中的地标"""
-        try:
-            response = self.client.landmark_detection(image=image)
-            landmarks = []
-
-            for landmark in response.landmark_annotations:
-                locations = []
-                for location in landmark.locations:
-                    locations.append(
-                        {
-                            "latitude": location.lat_lng.latitude,
-                            "longitude": location.lat_lng.longitude,
-                        }
-                    )
-
-                landmarks.append(
-                    {
-                        "name": landmark.description,
-                        "confidence": landmark.score,
-                        "locations": locations,
-                    }
-                )
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, analysis_type, future), response in zip(
+            batch, batch_response.responses
+        ):
+            if future.done():
+                continue
+
+            if response.error.message:
+                logger.warning(f"Vision分析部分失败: {response.error.message}")
+
+            results = {}
+            for feature in self._features_for(analysis_type):
+                results.update(_PARSERS[feature](response))
+            future.set_result(results)
+
+    # 响应解析
+
+    @staticmethod
+    def _parse_objects(response) -> Dict[str, Any]:
+        """解析对象检测结果"""
+        objects = []
+
+        for obj in response.localized_object_annotations:
+            vertices = []
+            for vertex in obj.bounding_poly.normalized_vertices:
+                vertices.append({"x": vertex.x, "y": vertex.y})
+
+            objects.append(
+                {
+                    "name": obj.name,
+                    "confidence": obj.score,
+                    "bounding_box": vertices,
+                }
+            )
 
-            return {"landmarks": landmarks}
+        return {"objects": objects}
 
-        except Exception as e:
-            print(f"地标检测失败: {e}")
-            return {"landmarks": []}
+    @staticmethod
+    def _parse_text(response) -> Dict[str, Any]:
+        """解析文本检测结果"""
+        texts = []
 
-    async def _detect_labels(self, image: vision.Image) -> Dict[str, Any]:
-        """检测图像标签"""
-        try:
-            response = self.client.label_detection(image=image)
-            labels = []
+        if response.text_annotations:
+            # 第一个结果是完整文本
+            full_text = response.text_annotations[0].description
 
-            for label in response.label_annotations:
-                labels.append(
-                    {
-                        "name": label.description,
-                        "confidence": label.score,
-                        "topicality": label.topicality,
-                    }
-                )
+            # 其余是单个文字/词语
+            for text in response.text_annotations[1:]:
+                vertices = []
+                for vertex in text.bounding_poly.vertices:
+                    vertices.append({"x": vertex.x, "y": vertex.y})
 
-            return {"labels": labels}
+                texts.append({"text": text.description, "bounding_box": vertices})
 
-        except Exception as e:
-            print(f"标签检测失败: {e}")
-            return {"labels": []}
+            return {
+                "text_detection": {
+                    "full_text": full_text,
+                    "individual_texts": texts,
+                }
+            }
 
-    async def _detect_faces(self, image: vision.Image) -> Dict[str, Any]:
-        """检测图像中的人脸"""
-        try:
-            response = self.client.face_detection(image=image)
-            faces = []
+        return {"text_detection": {"full_text": "", "individual_texts": []}}
 
-            for face in response.face_annotations:
-                vertices = []
-                for vertex in face.bounding_poly.vertices:
-                    vertices.append({"x": vertex.x, "y": vertex.y})
+    @staticmethod
+    def _parse_landmarks(response) -> Dict[str, Any]:
+        """解析地标检测结果"""
+        landmarks = []
 
-                faces.append(
+        for landmark in response.landmark_annotations:
+            locations = []
+            for location in landmark.locations:
+                locations.append(
                     {
-                        "bounding_box": vertices,
-                        "detection_confidence": face.detection_confidence,
-                        "joy_likelihood": face.joy_likelihood.name,
-                        "sorrow_likelihood": face.sorrow_likelihood.name,
-                        "anger_likelihood": face.anger_likelihood.name,
-                        "surprise_likelihood": face.surprise_likelihood.name,
+                        "latitude": location.lat_lng.latitude,
+                        "longitude": location.lat_lng.longitude,
                     }
                 )
 
-            return {"faces": faces}
+            landmarks.append(
+                {
+                    "name": landmark.description,
+                    "confidence": landmark.score,
+                    "locations": locations,
+                }
+            )
 
-        except Exception as e:
-            print(f"人脸检测失败: {e}")
-            return {"faces": []}
+        return {"landmarks": landmarks}
 
-    async def _analyze_safe_search(self, image: vision.Image) -> Dict[str, Any]:
-        """安全搜索分析"""
-        try:
-            response = self.client.safe_search_detection(image=image)
-            safe_search = response.safe_search_annotation
+    @staticmethod
+    def _parse_labels(response) -> Dict[str, Any]:
+        """解析标签检测结果"""
+        labels = []
 
-            return {
-                "safe_search": {
-                    "adult": safe_search.adult.name,
-                    "spoof": safe_search.spoof.name,
-                    "medical": safe_search.medical.name,
-                    "violence": safe_search.violence.name,
-                    "racy": safe_search.racy.name,
+        for label in response.label_annotations:
+            labels.append(
+                {
+                    "name": label.description,
+                    "confidence": label.score,
+                    "topicality": label.topicality,
                 }
+            )
+
+        return {"labels": labels}
+
+    @staticmethod
+    def _parse_faces(response) -> Dict[str, Any]:
+        """解析人脸检测结果"""
+        faces = []
+
+        for face in response.face_annotations:
+            vertices = []
+            for vertex in face.bounding_poly.vertices:
+                vertices.append({"x": vertex.x, "y": vertex.y})
+
+            faces.append(
+                {
+                    "bounding_box": vertices,
+                    "detection_confidence": face.detection_confidence,
+                    "joy_likelihood": face.joy_likelihood.name,
+                    "sorrow_likelihood": face.sorrow_likelihood.name,
+                    "anger_likelihood": face.anger_likelihood.name,
+                    "surprise_likelihood": face.surprise_likelihood.name,
+                }
+            )
+
+        return {"faces": faces}
+
+    @staticmethod
+    def _parse_safe_search(response) -> Dict[str, Any]:
+        """解析安全搜索结果"""
+        safe_search = response.safe_search_annotation
+
+        return {
+            "safe_search": {
+                "adult": safe_search.adult.name,
+                "spoof": safe_search.spoof.name,
+                "medical": safe_search.medical.name,
+                "violence": safe_search.violence.name,
+                "racy": safe_search.racy.name,
             }
-
-        except Exception as e:
-            print(f"安全搜索分析失败: {e}")
-            return {"safe_search": {}}
+        }
+
+
+# Vision特性 -> 响应解析函数（顺序与综合分析的结果合并顺序一致）
+_PARSERS: Dict[str, Callable[[Any], Dict[str, Any]]] = {
+    "OBJECT_LOCALIZATION": VisionService._parse_objects,
+    "TEXT_DETECTION": VisionService._parse_text,
+    "LANDMARK_DETECTION": VisionService._parse_landmarks,
+    "LABEL_DETECTION": VisionService._parse_labels,
+    "FACE_DETECTION": VisionService._parse_faces,
+    "SAFE_SEARCH_DETECTION": VisionService._parse_safe_search,
+}
+
+# 单项分析类型 -> Vision特性
+_ANALYSIS_FEATURES = {
+    "objects": "OBJECT_LOCALIZATION",
+    "text": "TEXT_DETECTION",
+    "landmarks": "LANDMARK_DETECTION",
+    "labels": "LABEL_DETECTION",
+    "faces": "FACE_DETECTION",
+    "safety": "SAFE_SEARCH_DETECTION",
+}
 
 
 # 全局Vision服务实例
@@ -0,0 +1,33 @@
+"""
+测试标注图像的输出编码
+"""
+
+import io
+
+import pytest
+from PIL import Image
+
+from main import _encode_annotated
+
+
+@pytest.mark.parametrize(
+    "output_format, pil_format", [("png", "PNG"), ("jpg", "JPEG"), ("webp", "WEBP")]
+)
+def test_encodes_into_requested_format(output_format, pil_format):
+    """测试按请求的格式一次性编码"""
+    image = Image.new("RGB", (40, 30), color="blue")
+
+    encoded = Image.open(io.BytesIO(_encode_annotated(image, output_format, 80)))
+
+    assert encoded.format == pil_format
+    assert encoded.size == (40, 30)
+
+
+def test_jpeg_flattens_transparency_onto_white():
+    """测试JPEG输出时透明区域合成到白色背景"""
+    image = Image.new("RGBA", (8, 8), color=(0, 0, 0, 0))
+
+    encoded = Image.open(io.BytesIO(_encode_annotated(image, "jpg", 95)))
+
+    assert encoded.mode == "RGB"
+    assert all(channel > 250 for channel in encoded.getpixel((4, 4)))
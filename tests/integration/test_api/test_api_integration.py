@@ -633,11 +633,11 @@ class TestAnnotatedImageEndpoint:
     @patch("services.gcs_service.download_image")
     @patch("services.enhanced_vision_service.detect_objects_enhanced")
     @patch("services.image_annotation_service.validate_annotation_request")
-    @patch("services.image_annotation_service.render_annotated_image")
+    @patch("services.image_annotation_service.render_annotated_image_pil")
     @patch("services.gcs_service.upload_image")
     @patch("services.image_annotation_service.get_annotation_statistics")
-    @patch("services.cache_service.get")
-    @patch("services.cache_service.set")
+    @patch("services.cache_service.get_raw_bytes")
+    @patch("services.cache_service.set_raw_bytes")
     def test_annotated_image_success(
         self,
         mock_cache_set,
@@ -704,10 +704,9 @@ class TestAnnotatedImageEndpoint:
         }
 
         # Mock annotation rendering
-        annotated_img = Image.new("RGB", (300, 200), color="blue")
-        annotated_buffer = io.BytesIO()
-        annotated_img.save(annotated_buffer, format="PNG")
-        mock_render_annotated.return_value = annotated_buffer.getvalue()
+        mock_render_annotated.return_value = Image.new(
+            "RGB", (300, 200), color="blue"
+        )
 
         # Mock GCS upload
         mock_upload_image.return_value = (
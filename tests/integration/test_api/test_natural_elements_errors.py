@@ -0,0 +1,48 @@
+"""
+测试自然元素分析接口的错误响应
+"""
+
+from unittest.mock import AsyncMock, patch
+
+from fastapi.testclient import TestClient
+
+from main import app
+from models.image import NaturalElementsResponse
+
+
+def test_error_payload_matches_response_model():
+    """测试分析失败时返回的字典与NaturalElementsResponse结构一致"""
+    with patch(
+        "main.cache_service.mget", new=AsyncMock(return_value=[None, None])
+    ), patch(
+        "main.gcs_service.download_image",
+        new=AsyncMock(side_effect=RuntimeError("boom")),
+    ):
+        response = TestClient(app).post(
+            "/api/v1/analyze-nature", json={"image_hash": "abc123"}
+        )
+
+    assert response.status_code == 200
+    data = response.json()
+    parsed = NaturalElementsResponse.model_validate(data)
+    assert set(data) == set(NaturalElementsResponse.model_fields)
+    assert parsed.success is False
+    assert parsed.error_message == "Natural elements analysis failed: boom"
+
+
+def test_recent_failure_served_from_negative_cache():
+    """测试近期失败的请求直接返回缓存的错误，不再重新分析"""
+    download = AsyncMock()
+    with patch(
+        "main.cache_service.mget",
+        new=AsyncMock(return_value=[None, {"error_message": "cached failure"}]),
+    ), patch("main.gcs_service.download_image", new=download):
+        response = TestClient(app).post(
+            "/api/v1/analyze-nature", json={"image_hash": "abc123"}
+        )
+
+    data = response.json()
+    assert data["success"] is False
+    assert data["from_cache"] is True
+    assert data["error_message"] == "cached failure"
+    download.assert_not_called()
@@ -0,0 +1,26 @@
+"""
+测试健康检查与统计接口共享的统计快照
+"""
+
+from unittest.mock import AsyncMock, Mock, patch
+
+from fastapi.testclient import TestClient
+
+from main import app
+
+
+def test_polls_within_ttl_share_one_snapshot():
+    """测试有效期内的重复轮询只收集一次统计"""
+    storage_stats = AsyncMock(return_value={"total_images": 3})
+    cache_stats = Mock(return_value={"enabled": False})
+    with patch("main._stats_snapshot", None), patch(
+        "main.storage_service.get_stats", new=storage_stats
+    ), patch("main.cache_service.get_stats", new=cache_stats):
+        client = TestClient(app)
+        health = client.get("/health").json()
+        stats = client.get("/api/v1/stats").json()
+
+    assert health["storage_stats"] == {"total_images": 3}
+    assert stats["cache"] == {"enabled": False}
+    storage_stats.assert_awaited_once()
+    cache_stats.assert_called_once()
@@ -0,0 +1,40 @@
+"""
+测试v1分析路由的缓存命中路径
+"""
+
+from unittest.mock import AsyncMock, patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1.endpoints.analysis import router
+from models.image import NaturalElementsResponse
+from services.rate_limiter import limiter
+
+
+def _client() -> TestClient:
+    """挂载v1分析路由的测试客户端"""
+    app = FastAPI()
+    app.state.limiter = limiter
+    app.include_router(router)
+    return TestClient(app)
+
+
+def test_cached_nature_analysis_is_returned_as_copy():
+    """测试缓存命中时返回带缓存标记的副本，而不是修改不可变模型"""
+    cached = NaturalElementsResponse(
+        image_hash="abc123", processing_time_ms=900, success=True
+    ).model_dump(mode="json")
+    download = AsyncMock()
+    with patch(
+        "app.api.v1.endpoints.analysis.cache_service.get",
+        new=AsyncMock(return_value=cached),
+    ), patch("app.api.v1.endpoints.analysis.gcs_service.download_image", new=download):
+        response = _client().post("/analyze-nature", json={"image_hash": "abc123"})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["success"] is True
+    assert data["from_cache"] is True
+    assert data["processing_time_ms"] < 900
+    download.assert_not_called()
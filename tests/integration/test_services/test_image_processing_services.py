@@ -715,6 +715,28 @@ class TestImageAnnotationService:
         assert pil_image.size == (300, 200)  # Original image size
         assert pil_image.mode == "RGB"
 
+    def test_render_annotated_image_pil_returns_image(
+        self, service, mock_image_content, mock_objects, mock_faces
+    ):
+        """Test PIL variant returns the drawn image without an encode round-trip"""
+        pil_image = service.render_annotated_image_pil(
+            image_content=mock_image_content,
+            objects=mock_objects,
+            faces=mock_faces,
+        )
+
+        assert isinstance(pil_image, Image.Image)
+        assert pil_image.size == (300, 200)
+        assert pil_image.mode == "RGB"
+
+        encoded = io.BytesIO()
+        pil_image.save(encoded, format="PNG")
+        assert encoded.getvalue() == service.render_annotated_image(
+            image_content=mock_image_content,
+            objects=mock_objects,
+            faces=mock_faces,
+        )
+
     def test_render_bounding_boxes_only(
         self, service, mock_image_content, mock_objects
     ):
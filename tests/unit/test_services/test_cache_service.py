@@ -0,0 +1,353 @@
+"""
+测试缓存服务
+"""
+
+import asyncio
+from datetime import datetime
+from unittest.mock import Mock
+
+import pytest
+from pydantic import BaseModel
+
+from services.cache_service import (
+    CACHE_CODEC_MSGPACK,
+    CACHE_COMPRESS_MIN_BYTES,
+    CacheService,
+    LocalTTLCache,
+    cache_params_digest,
+    decode_cache_value,
+    encode_cache_value,
+)
+
+
+@pytest.fixture
+def cache():
+    """创建使用模拟Redis客户端的缓存服务"""
+    service = CacheService()
+    service.redis_client = Mock()
+    service.raw_client = Mock()
+    service.enabled = True
+    return service
+
+
+class TestRawBytesCache:
+    """测试原始字节缓存"""
+
+    @pytest.mark.asyncio
+    async def test_get_raw_bytes_returns_stored_bytes(self, cache):
+        """测试原样返回缓存字节"""
+        cache.raw_client.get.return_value = b'{"from_cache":true}'
+
+        assert await cache.get_raw_bytes("key") == b'{"from_cache":true}'
+        cache.raw_client.get.assert_called_once_with("key")
+
+    @pytest.mark.asyncio
+    async def test_set_raw_bytes_uses_ttl_seconds(self, cache):
+        """测试按秒设置过期时间"""
+        assert await cache.set_raw_bytes("key", b"{}", ttl_seconds=60)
+        cache.raw_client.setex.assert_called_once_with("key", 60, b"{}")
+
+    @pytest.mark.asyncio
+    async def test_raw_bytes_disabled(self, cache):
+        """测试缓存禁用时不访问Redis"""
+        cache.enabled = False
+
+        assert await cache.get_raw_bytes("key") is None
+        assert not await cache.set_raw_bytes("key", b"{}", ttl_seconds=60)
+        cache.raw_client.get.assert_not_called()
+
+
+class TestCacheCodec:
+    """测试msgpack缓存编码"""
+
+    def test_roundtrip(self):
+        """测试编码后可以原样解码"""
+        value = {"labels": [{"name": "tree", "confidence": 0.9}], "count": 1}
+
+        data = encode_cache_value(value)
+
+        assert data.startswith(CACHE_CODEC_MSGPACK)
+        assert decode_cache_value(data) == value
+
+    def test_encodes_models_and_datetimes(self):
+        """测试Pydantic模型和时间会被转换为JSON兼容类型"""
+
+        class Sample(BaseModel):
+            name: str
+            created: datetime
+
+        created = datetime(2024, 1, 1, 12, 0, 0)
+        data = encode_cache_value(Sample(name="a", created=created))
+
+        assert decode_cache_value(data) == {
+            "name": "a",
+            "created": "2024-01-01T12:00:00",
+        }
+
+    def test_large_values_are_compressed(self):
+        """测试较大的条目压缩存储且可以原样解码"""
+        value = {"colors": [[12, 200, 34]] * 2000}
+
+        data = encode_cache_value(value)
+
+        assert not data.startswith(CACHE_CODEC_MSGPACK)
+        assert len(data) < CACHE_COMPRESS_MIN_BYTES
+        assert decode_cache_value(data) == value
+
+    @pytest.mark.asyncio
+    async def test_large_raw_bytes_are_compressed(self, cache):
+        """测试较大的原始字节压缩存储，读取时透明解压"""
+        body = b'{"labels":[' + b'"tree",' * 2000 + b'"sky"]}'
+
+        await cache.set_raw_bytes("key", body, ttl_seconds=60)
+        stored = cache.raw_client.setex.call_args[0][2]
+        cache.raw_client.get.return_value = stored
+
+        assert len(stored) < len(body)
+        assert await cache.get_raw_bytes("key") == body
+
+    def test_legacy_json_is_rejected(self):
+        """测试旧的JSON条目无法解码"""
+        assert decode_cache_value(b'{"a": 1}') is None
+
+    @pytest.mark.asyncio
+    async def test_get_evicts_legacy_entries(self, cache):
+        """测试读取旧格式条目时清除该键"""
+        cache.raw_client.get.return_value = b'{"a": 1}'
+
+        assert await cache.get("key") is None
+        cache.raw_client.delete.assert_called_once_with("key")
+
+
+class TestVersionedCache:
+    """测试带版本元数据的缓存"""
+
+    @pytest.mark.asyncio
+    async def test_matching_entry_returns_body(self, cache):
+        """测试版本和配置指纹一致时返回缓存内容"""
+        cache.raw_client.get.return_value = encode_cache_value(
+            {"v": 1, "cfg_hash": "abc", "body": {"success": True}}
+        )
+
+        assert await cache.get_versioned("key", 1, "abc") == {"success": True}
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("version, cfg_hash", [(2, "abc"), (1, "def")])
+    async def test_stale_entry_is_evicted(self, cache, version, cfg_hash):
+        """测试版本或配置指纹变化时视为未命中并清除"""
+        cache.raw_client.get.return_value = encode_cache_value(
+            {"v": 1, "cfg_hash": "abc", "body": {"success": True}}
+        )
+        cache.redis_client.delete.return_value = 1
+
+        assert await cache.get_versioned("key", version, cfg_hash) is None
+        cache.redis_client.delete.assert_called_once_with("key")
+
+
+class TestAdaptiveTTL:
+    """测试自适应缓存TTL"""
+
+    @pytest.mark.parametrize(
+        "processing_time_ms, expected",
+        [(10, 600), (5000, 9000), (3_600_000, 86400)],
+    )
+    def test_ttl_scales_with_processing_time(self, processing_time_ms, expected):
+        """测试TTL随计算耗时增长并限制在上下限之间"""
+        assert CacheService.adaptive_ttl_seconds(processing_time_ms) == expected
+
+    @pytest.mark.asyncio
+    async def test_set_uses_ttl_seconds(self, cache):
+        """测试显式传入的秒级TTL"""
+        assert await cache.set("key", {"a": 1}, ttl_seconds=1200)
+        assert cache.raw_client.setex.call_args[0][1] == 1200
+
+    @pytest.mark.asyncio
+    async def test_large_entries_expire_sooner(self, cache):
+        """测试超大条目的TTL被缩短"""
+        assert await cache.set("key", {"blob": "x" * (300 * 1024)}, ttl_seconds=86400)
+        assert cache.raw_client.setex.call_args[0][1] == 900
+
+
+class TestSetWithMetric:
+    """测试写入缓存时合并统计计数"""
+
+    @pytest.mark.asyncio
+    async def test_set_and_counter_share_pipeline(self, cache):
+        """测试写入与计数在同一个pipeline中执行"""
+        pipe = cache.raw_client.pipeline.return_value
+
+        assert await cache.set_with_metric("key", {"a": 1}, 600, "natural_elements_miss")
+
+        cache.raw_client.pipeline.assert_called_once_with(transaction=False)
+        pipe.setex.assert_called_once_with("key", 600, encode_cache_value({"a": 1}))
+        pipe.hincrby.assert_called_once_with("stats:cache", "natural_elements_miss", 1)
+        pipe.execute.assert_called_once()
+        cache.raw_client.setex.assert_not_called()
+
+
+class TestCacheParamsDigest:
+    """测试缓存键参数摘要"""
+
+    def test_digest_is_stable_and_order_independent(self):
+        """测试摘要与键顺序无关且长度固定"""
+        first = cache_params_digest({"depth": "basic", "colors": True})
+        second = cache_params_digest({"colors": True, "depth": "basic"})
+
+        assert first == second
+        assert len(first) == 16
+
+    def test_digest_changes_with_params(self):
+        """测试参数变化时摘要不同"""
+        assert cache_params_digest({"colors": True}) != cache_params_digest(
+            {"colors": False}
+        )
+
+
+class TestLocalCache:
+    """测试进程内一级缓存"""
+
+    @pytest.mark.asyncio
+    async def test_repeat_get_served_from_local(self, cache):
+        """测试重复读取不再访问Redis"""
+        cache.raw_client.get.return_value = encode_cache_value({"a": 1})
+
+        assert await cache.get("key") == {"a": 1}
+        assert await cache.get("key") == {"a": 1}
+
+        cache.raw_client.get.assert_called_once_with("key")
+        assert cache.cache_stats["l1_hits"] == 1
+        assert cache.cache_stats["l2_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_set_populates_local(self, cache):
+        """测试写入后可直接从一级缓存读取"""
+        await cache.set("key", {"a": 1}, ttl_seconds=600)
+
+        assert await cache.get("key") == {"a": 1}
+        cache.raw_client.get.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_delete_evicts_local(self, cache):
+        """测试删除时同时清除一级缓存"""
+        await cache.set("key", {"a": 1}, ttl_seconds=600)
+        cache.redis_client.delete.return_value = 1
+        cache.raw_client.get.return_value = None
+
+        await cache.delete("key")
+
+        assert await cache.get("key") is None
+
+    def test_expired_entries_are_dropped(self, monkeypatch):
+        """测试过期条目视为未命中"""
+        local = LocalTTLCache(maxsize=2, ttl_seconds=10)
+        now = [100.0]
+        monkeypatch.setattr("services.cache_service.time.monotonic", lambda: now[0])
+
+        local.set("key", 1)
+        now[0] += 11
+
+        assert local.get("key") is None
+
+    def test_least_recently_used_is_evicted(self):
+        """测试超出容量时淘汰最久未使用的条目"""
+        local = LocalTTLCache(maxsize=2, ttl_seconds=10)
+        local.set("a", 1)
+        local.set("b", 2)
+        local.get("a")
+        local.set("c", 3)
+
+        assert local.get("b") is None
+        assert local.get("a") == 1
+
+
+class TestSingleFlight:
+    """测试并发未命中合并"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_computation(self, cache):
+        """测试同一键的并发调用只计算一次"""
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"a": 1}
+
+        results = await asyncio.gather(
+            *(cache.single_flight("key", compute) for _ in range(10))
+        )
+
+        assert calls == 1
+        assert results == [{"a": 1}] * 10
+        assert not cache._inflight
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_every_caller(self, cache):
+        """测试计算失败时所有调用者都收到异常"""
+
+        async def compute():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("vision failed")
+
+        results = await asyncio.gather(
+            *(cache.single_flight("key", compute) for _ in range(3)),
+            return_exceptions=True,
+        )
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert not cache._inflight
+
+
+class TestMultiGet:
+    """测试批量读取"""
+
+    @pytest.mark.asyncio
+    async def test_only_local_misses_hit_redis(self, cache):
+        """测试一级缓存未命中的键通过一次MGET读取"""
+        await cache.set("a", {"a": 1}, ttl_seconds=600)
+        cache.raw_client.mget.return_value = [encode_cache_value({"b": 2}), None]
+
+        assert await cache.mget(["a", "b", "c"]) == [{"a": 1}, {"b": 2}, None]
+        cache.raw_client.mget.assert_called_once_with(["b", "c"])
+        cache.raw_client.get.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_unwrap_versioned_rejects_stale_entry(self, cache):
+        """测试批量读取的版本化条目同样校验版本"""
+        cache.redis_client.delete.return_value = 1
+        entry = {"v": 1, "cfg_hash": "abc", "body": {"success": True}}
+
+        assert await cache.unwrap_versioned("key", entry, 1, "abc") == {"success": True}
+        assert await cache.unwrap_versioned("key", entry, 2, "abc") is None
+        cache.redis_client.delete.assert_called_once_with("key")
+
+
+class TestImageKeyIndex:
+    """测试按图像登记缓存键并批量清除"""
+
+    @pytest.mark.asyncio
+    async def test_write_registers_key_in_same_pipeline(self, cache):
+        """测试写入时在同一pipeline中登记缓存键"""
+        pipe = cache.raw_client.pipeline.return_value
+
+        await cache.set_raw_bytes("label_analysis:h1:x", b"{}", 60, image_hash="h1")
+
+        pipe.setex.assert_called_once_with("label_analysis:h1:x", 60, b"{}")
+        pipe.sadd.assert_called_once_with("img_keys:h1", "label_analysis:h1:x")
+        pipe.execute.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_delete_unlinks_all_registered_keys(self, cache):
+        """测试删除图像缓存时一次性清除所有登记的键及索引"""
+        await cache.set("nature_analysis:h1:x", {"a": 1}, ttl_seconds=600)
+        cache.redis_client.smembers.return_value = {"nature_analysis:h1:x"}
+        cache.redis_client.unlink.return_value = 2
+        cache.raw_client.get.return_value = None
+
+        assert await cache.delete_analysis_result("h1") == 2
+
+        cache.redis_client.unlink.assert_called_once_with(
+            "nature_analysis:h1:x", "img_keys:h1"
+        )
+        assert await cache.get("nature_analysis:h1:x") is None
@@ -0,0 +1,126 @@
+"""
+测试重复上传预过滤器
+"""
+
+import io
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from PIL import Image
+
+from services.dedup_filter import (
+    DEDUP_BITMAP_BITS,
+    DEDUP_BITMAP_KEY,
+    NEAR_DUPLICATE_KEY_PREFIX,
+    DedupFilter,
+    NearDuplicateIndex,
+)
+from services.hash_service import near_duplicate_fingerprint
+
+
+@pytest.fixture
+def raw_client():
+    """模拟缓存服务的Redis客户端"""
+    client = Mock()
+    with patch("services.dedup_filter.cache_service") as cache:
+        cache.is_enabled.return_value = True
+        cache.raw_client = client
+        yield client
+
+
+class TestDedupFilter:
+    """测试基于位图的去重预过滤"""
+
+    def test_fingerprint_is_stable_and_bounded(self):
+        """测试指纹稳定且落在位图范围内"""
+        head = b"\xff\xd8\xff\xe0" + b"park" * 1000
+
+        offset = DedupFilter.fingerprint(head)
+
+        assert offset == DedupFilter.fingerprint(head)
+        assert 0 <= offset < DEDUP_BITMAP_BITS
+
+    @pytest.mark.asyncio
+    async def test_maybe_known_reads_bit(self, raw_client):
+        """测试根据位图中的位判断是否可能已上传"""
+        raw_client.getbit.return_value = 0
+
+        assert not await DedupFilter().maybe_known(42)
+        raw_client.getbit.assert_called_once_with(DEDUP_BITMAP_KEY, 42)
+
+    @pytest.mark.asyncio
+    async def test_mark_known_sets_bit(self, raw_client):
+        """测试标记时设置对应的位"""
+        await DedupFilter().mark_known(42)
+
+        raw_client.setbit.assert_called_once_with(DEDUP_BITMAP_KEY, 42, 1)
+
+    @pytest.mark.asyncio
+    async def test_redis_errors_fall_back_to_full_check(self, raw_client):
+        """测试Redis异常时保守地走完整重复检查"""
+        raw_client.getbit.side_effect = ConnectionError("redis down")
+
+        assert await DedupFilter().maybe_known(42)
+
+
+def _jpeg_bytes(image: Image.Image, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def pointer_cache():
+    """模拟近似重复指针的缓存读写"""
+    with patch("services.dedup_filter.cache_service") as cache:
+        cache.is_enabled.return_value = True
+        cache.get = AsyncMock(return_value=None)
+        cache.set = AsyncMock(return_value=True)
+        yield cache
+
+
+class TestNearDuplicateIndex:
+    """测试近似重复图像的结果复用"""
+
+    park = Image.effect_mandelbrot((128, 96), (-2, -1.5, 1, 1.5), 60).convert("RGB")
+
+    @pytest.mark.asyncio
+    async def test_first_image_registers_pointer_under_its_own_hash(self, pointer_cache):
+        """测试首张图像登记为指针，并登记到自身的缓存键索引"""
+        content = _jpeg_bytes(self.park, 90)
+
+        assert await NearDuplicateIndex().resolve("a" * 32, "ff00", content) is None
+
+        key, value = pointer_cache.set.call_args.args
+        assert key == NEAR_DUPLICATE_KEY_PREFIX + "ff00"
+        assert value["image_hash"] == "a" * 32
+        assert pointer_cache.set.call_args.kwargs["image_hash"] == "a" * 32
+
+    @pytest.mark.asyncio
+    async def test_reencoded_copy_resolves_to_source(self, pointer_cache):
+        """测试重新压缩的副本复用原图的结果"""
+        pointer_cache.get.return_value = {
+            "image_hash": "a" * 32,
+            "fingerprint": near_duplicate_fingerprint(_jpeg_bytes(self.park, 90)),
+        }
+
+        source = await NearDuplicateIndex().resolve(
+            "b" * 32, "ff00", _jpeg_bytes(self.park, 60)
+        )
+
+        assert source == "a" * 32
+        pointer_cache.set.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_perceptual_hash_collision_is_rejected(self, pointer_cache):
+        """测试感知哈希相同但内容不同的图像不会复用结果"""
+        pointer_cache.get.return_value = {
+            "image_hash": "a" * 32,
+            "fingerprint": near_duplicate_fingerprint(_jpeg_bytes(self.park, 90)),
+        }
+        other = self.park.transpose(Image.Transpose.FLIP_LEFT_RIGHT)
+
+        assert (
+            await NearDuplicateIndex().resolve("b" * 32, "ff00", _jpeg_bytes(other, 90))
+            is None
+        )
@@ -0,0 +1,40 @@
+"""
+测试GCS存储服务
+"""
+
+from unittest.mock import Mock, patch
+
+from services.gcs_service import PARALLEL_DOWNLOAD_THRESHOLD, GCSService
+
+
+def _service() -> GCSService:
+    """创建不连接GCS的服务实例"""
+    return GCSService.__new__(GCSService)
+
+
+class TestDownloadBlobBytes:
+    """测试按对象大小选择下载方式"""
+
+    def test_small_blob_downloads_in_one_request(self):
+        """测试小对象直接一次性下载"""
+        blob = Mock(size=1024)
+        blob.download_as_bytes.return_value = b"small"
+
+        assert _service()._download_blob_bytes(blob) == b"small"
+
+    def test_large_blob_downloads_chunks_concurrently(self):
+        """测试大对象分块并发下载到临时文件后读回"""
+        blob = Mock(size=PARALLEL_DOWNLOAD_THRESHOLD + 1)
+
+        def fake_download(blob, filename, **kwargs):
+            with open(filename, "wb") as f:
+                f.write(b"large")
+
+        with patch(
+            "google.cloud.storage.transfer_manager.download_chunks_concurrently",
+            side_effect=fake_download,
+        ) as download:
+            assert _service()._download_blob_bytes(blob) == b"large"
+
+        blob.download_as_bytes.assert_not_called()
+        assert download.call_args.kwargs["worker_type"] == "thread"
@@ -0,0 +1,75 @@
+"""
+测试图像哈希服务
+"""
+
+import hashlib
+import io
+import tempfile
+
+import pytest
+from PIL import Image
+
+from services.hash_service import average_hash_hex, hash_service, new_content_hasher
+
+
+def _png_bytes() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (32, 32), color="green").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class TestStreamingHash:
+    """测试流式组合哈希"""
+
+    def test_matches_in_memory_hash(self):
+        """测试流式计算结果与整块计算一致，并复位文件指针"""
+        content = _png_bytes()
+        md5_obj = hashlib.md5()
+
+        with tempfile.SpooledTemporaryFile(max_size=16) as spool:
+            for start in range(0, len(content), 7):
+                chunk = content[start : start + 7]
+                md5_obj.update(chunk)
+                spool.write(chunk)
+            spool.seek(0)
+
+            result = hash_service.calculate_combined_hash_streaming(md5_obj, spool)
+
+            assert spool.tell() == 0
+
+        assert result == hash_service.calculate_combined_hash(content)
+
+
+class TestAverageHash:
+    """测试向量化平均哈希"""
+
+    def test_matches_imagehash(self):
+        """测试结果与imagehash.average_hash一致"""
+        imagehash = pytest.importorskip("imagehash")
+        image = Image.effect_mandelbrot((64, 48), (-2, -1.5, 1, 1.5), 50).convert("RGB")
+
+        assert average_hash_hex(image.copy()) == str(imagehash.average_hash(image))
+
+
+class TestContentHasher:
+    """测试可配置的内容哈希算法"""
+
+    def test_defaults_to_md5(self):
+        """测试默认使用MD5，保持已有图像标识不变"""
+        content = _png_bytes()
+
+        assert hash_service.calculate_md5_hash(content) == hashlib.md5(content).hexdigest()
+
+    @pytest.mark.parametrize("algorithm", ["blake2b", "blake3"])
+    def test_alternative_algorithms_keep_identifier_length(self, monkeypatch, algorithm):
+        """测试切换算法后标识长度不变，且增量计算与整块计算一致"""
+        monkeypatch.setattr("services.hash_service.settings.CONTENT_HASH_ALGORITHM", algorithm)
+        content = _png_bytes()
+
+        hasher = new_content_hasher()
+        hasher.update(content[:10])
+        hasher.update(content[10:])
+
+        assert hasher.hexdigest() == hash_service.calculate_md5_hash(content)
+        assert len(hasher.hexdigest()) == 32
+        assert hasher.hexdigest() != hashlib.md5(content).hexdigest()
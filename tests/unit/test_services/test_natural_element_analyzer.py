@@ -0,0 +1,52 @@
+"""
+测试自然元素分析器
+"""
+
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import pytest
+
+from services.natural_element_analyzer import NaturalElementAnalyzer
+
+
+@pytest.fixture
+def vision_client():
+    """返回固定植被标签的模拟Vision客户端"""
+    labels = [
+        SimpleNamespace(description=name, score=0.9, topicality=0.9)
+        for name in ("Tree", "Grass", "Sky", "Leaf")
+    ]
+    client = Mock()
+    client.label_detection.return_value = SimpleNamespace(
+        error=SimpleNamespace(message=""), label_annotations=labels
+    )
+    return client
+
+
+class TestSectionSelection:
+    """测试按需计算分析部分"""
+
+    @pytest.mark.asyncio
+    async def test_disabled_sections_are_not_computed(self, vision_client):
+        """测试关闭的分析部分不会被计算"""
+        analyzer = NaturalElementAnalyzer()
+
+        with patch.object(analyzer, "_analyze_image_colors") as colors, patch.object(
+            analyzer, "_create_seasonal_analysis"
+        ) as seasonal:
+            result = await analyzer.analyze_natural_elements(
+                image_content=b"image",
+                vision_client=vision_client,
+                include_health=False,
+                include_seasonal=False,
+                include_color=False,
+            )
+
+        colors.assert_not_called()
+        seasonal.assert_not_called()
+        assert result.vegetation_health_metrics is None
+        assert result.seasonal_analysis is None
+        assert result.dominant_colors == []
+        assert result.color_diversity_score is None
+        assert result.vegetation_coverage > 0
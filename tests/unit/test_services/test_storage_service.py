@@ -0,0 +1,74 @@
+"""
+测试图像元数据存储服务
+"""
+
+from datetime import datetime
+
+import pytest
+
+from models.image import ImageInfo
+from services.storage_service import StorageService
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    """创建使用临时目录的存储服务"""
+    monkeypatch.chdir(tmp_path)
+    return StorageService(storage_file=str(tmp_path / "metadata.json"))
+
+
+def _image_info(**overrides) -> ImageInfo:
+    fields = dict(
+        image_id="id1",
+        image_hash="hash1",
+        filename="park.jpg",
+        file_size=10,
+        content_type="image/jpeg",
+        gcs_url="https://example.com/park.jpg",
+        upload_time=datetime(2024, 1, 1),
+    )
+    fields.update(overrides)
+    return ImageInfo(**fields)
+
+
+class TestImageInfoCache:
+    """测试按哈希查询的进程内缓存"""
+
+    @pytest.mark.asyncio
+    async def test_repeat_lookups_reuse_instance(self, storage):
+        """测试重复查询返回缓存的对象"""
+        await storage.save_image_info(_image_info())
+
+        first = await storage.get_image_info_by_hash("hash1")
+
+        assert first is await storage.get_image_info_by_hash("hash1")
+
+    @pytest.mark.asyncio
+    async def test_updates_invalidate_cache(self, storage):
+        """测试更新分析结果和删除后缓存失效"""
+        await storage.save_image_info(_image_info())
+        await storage.get_image_info_by_hash("hash1")
+
+        await storage.update_analysis_results("hash1", {"labels": []})
+        updated = await storage.get_image_info_by_hash("hash1")
+        assert updated.processed is True
+
+        await storage.delete_image_info_by_hash("hash1")
+        assert await storage.get_image_info_by_hash("hash1") is None
+
+
+class TestListImages:
+    """测试图像分页列表"""
+
+    @pytest.mark.asyncio
+    async def test_pages_follow_upload_order(self, storage):
+        """测试分页按上传顺序返回"""
+        for i in range(5):
+            await storage.save_image_info(
+                _image_info(image_id=f"id{i}", image_hash=f"hash{i}")
+            )
+
+        page = await storage.list_images(limit=2, offset=1)
+
+        assert [info.image_id for info in page] == ["id1", "id2"]
+        assert await storage.list_images(limit=2, offset=5) == []
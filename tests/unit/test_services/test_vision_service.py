@@ -0,0 +1,79 @@
+"""
+测试Vision服务请求合批
+"""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import pytest
+
+from services.vision_service import VISION_BATCH_MAX_SIZE, VisionService
+
+
+def _label_response(name):
+    """构造只包含标签结果的响应"""
+    return SimpleNamespace(
+        error=SimpleNamespace(message=""),
+        label_annotations=[
+            SimpleNamespace(description=name, score=0.9, topicality=0.8)
+        ],
+    )
+
+
+@pytest.fixture
+def vision():
+    """创建使用模拟客户端的Vision服务"""
+    with patch("services.vision_service.vision.ImageAnnotatorClient", Mock):
+        service = VisionService()
+    assert service.enabled
+    return service
+
+
+class TestVisionBatching:
+    """测试并发请求合批"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_call(self, vision):
+        """测试并发请求合并为一次批量调用"""
+        vision.client.batch_annotate_images.side_effect = lambda requests: (
+            SimpleNamespace(
+                responses=[_label_response(f"label_{i}") for i in range(len(requests))]
+            )
+        )
+
+        results = await asyncio.gather(
+            *(vision.analyze_image(b"image", "labels") for _ in range(3))
+        )
+
+        assert vision.client.batch_annotate_images.call_count == 1
+        assert [r["labels"][0]["name"] for r in results] == [
+            "label_0",
+            "label_1",
+            "label_2",
+        ]
+        assert all(r["analysis_type"] == "labels" for r in results)
+
+    @pytest.mark.asyncio
+    async def test_full_batch_is_split(self, vision):
+        """测试超过批量上限时拆分为多次调用"""
+        vision.client.batch_annotate_images.side_effect = lambda requests: (
+            SimpleNamespace(responses=[_label_response("x") for _ in requests])
+        )
+
+        await asyncio.gather(
+            *(
+                vision.analyze_image(b"image", "labels")
+                for _ in range(VISION_BATCH_MAX_SIZE + 1)
+            )
+        )
+
+        assert vision.client.batch_annotate_images.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_batch_failure_propagates(self, vision):
+        """测试批量调用失败时所有请求都收到异常"""
+        vision.client.batch_annotate_images.side_effect = RuntimeError("quota")
+
+        with pytest.raises(Exception, match="quota"):
+            await vision.analyze_image(b"image", "labels")